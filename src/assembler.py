@@ -0,0 +1,314 @@
+"""Montador e desmontador para a ISA do mips16x
+
+Sintaxe (uma instrução por linha, comentários com '#', ';' ou '//'):
+
+    loop:   ADDI $1, $1, -1         # tipo I: rt, rs, imediato de 4 bits com sinal
+            ADD  $3, $1, $2         # tipo R: rd, rs, rt
+            LW   $4, 2($1)          # memória: rt, offset(rs)
+            SW   $4, 0($1)
+            BEQ  $1, $0, fim        # desvio: rs, rt, rótulo ou endereço absoluto
+            JUMP loop               # salto: rótulo ou endereço absoluto
+    fim:    JUMP fim
+            .org 0x40               # posiciona o próximo item no endereço (em bytes)
+            .word 0x1234            # palavra literal de 16 bits
+
+Formato das instruções: [opcode(4) | rs(4) | rt(4) | rd/imediato(4)].
+"""
+import argparse
+import hashlib
+import os
+import re
+from pathlib import Path
+
+from abstract import CONTROL_TABLE, ControlWord
+
+# Mnemônico -> opcode, derivado da tabela de controle
+OPCODES: dict[str, int] = {word.mnemonic: opcode for opcode, word in CONTROL_TABLE.items()}
+
+# Versão da codificação: entra na chave do cache junto com a tabela de controle
+ASSEMBLER_VERSION = 1
+ISA_FINGERPRINT = hashlib.sha256(f'{ASSEMBLER_VERSION}:{sorted(CONTROL_TABLE.items())}'.encode()).hexdigest()
+
+_COMMENT = re.compile(r'(#|;|//).*')
+_LABEL = re.compile(r'^\s*([A-Za-z_.][\w.]*)\s*:')
+_MEM_OPERAND = re.compile(r'^(.+)\(\s*(\$\w+)\s*\)$')
+
+
+class AssemblerError(ValueError):
+    """Erro de montagem com o número da linha do fonte"""
+    def __init__(self, line_number: int, message: str) -> None:
+        super().__init__(f'line {line_number}: {message}')
+        self.line_number = line_number
+        self.message = message
+
+
+def instruction_format(word: ControlWord) -> str:
+    """Deduz o formato dos operandos a partir dos sinais de controle do opcode"""
+    if word.jump:
+        return 'J'
+    if word.branch:
+        return 'B'
+    if word.mem_to_reg or word.mem_write_enable:
+        return 'M'
+    if word.reg_dst:
+        return 'R'
+    return 'I'
+
+
+def _parse_register(token: str, line_number: int) -> int:
+    token = token.strip()
+    if not token.startswith('$'):
+        raise AssemblerError(line_number, f'expected a register, got "{token}"')
+    try:
+        reg = int(token[1:])
+    except ValueError:
+        raise AssemblerError(line_number, f'invalid register "{token}"') from None
+    if not 0 <= reg <= 15:
+        raise AssemblerError(line_number, f'register "{token}" out of range ($0-$15)')
+    return reg
+
+
+def _parse_int(token: str, line_number: int) -> int:
+    try:
+        return int(token.strip(), 0)
+    except ValueError:
+        raise AssemblerError(line_number, f'invalid number "{token.strip()}"') from None
+
+
+def _imm4(value: int, line_number: int) -> int:
+    """Codifica um imediato de 4 bits com sinal (-8 a 7)"""
+    if not -8 <= value <= 7:
+        raise AssemblerError(line_number, f'immediate {value} does not fit in 4 signed bits (-8..7)')
+    return value & 0xF
+
+
+def _split_lines(source: str) -> list[tuple[int, list[str], str]]:
+    """Separa cada linha em (número, rótulos, instrução)"""
+    lines = []
+    for line_number, line in enumerate(source.splitlines(), start=1):
+        text = _COMMENT.sub('', line)
+        labels = []
+        while match := _LABEL.match(text):
+            labels.append(match.group(1))
+            text = text[match.end():]
+        lines.append((line_number, labels, text.strip()))
+    return lines
+
+
+def _item_size(mnemonic: str, operands: list[str], line_number: int) -> int:
+    if mnemonic == '.word':
+        return 2 * len(operands)
+    if mnemonic in OPCODES:
+        return 2
+    raise AssemblerError(line_number, f'unknown instruction "{mnemonic}"')
+
+
+def _split_operands(text: str) -> tuple[str, list[str]]:
+    parts = text.split(None, 1)
+    mnemonic = parts[0].upper() if not parts[0].startswith('.') else parts[0].lower()
+    operands = [op.strip() for op in parts[1].split(',')] if len(parts) > 1 else []
+    return mnemonic, operands
+
+
+def _resolve(token: str, labels: dict[str, int], line_number: int) -> int:
+    token = token.strip()
+    if token in labels:
+        return labels[token]
+    return _parse_int(token, line_number)
+
+
+def encode(mnemonic: str, operands: list[str], pc: int, labels: dict[str, int], line_number: int = 0) -> int:
+    """Codifica uma instrução localizada no endereço `pc`"""
+    opcode = OPCODES[mnemonic]
+    fmt = instruction_format(CONTROL_TABLE[opcode])
+    expected = {'R': 3, 'I': 3, 'M': 2, 'B': 3, 'J': 1}[fmt]
+    if len(operands) != expected:
+        raise AssemblerError(line_number, f'{mnemonic} expects {expected} operands, got {len(operands)}')
+
+    match fmt:
+        case 'R':  # rd, rs, rt
+            rd, rs, rt = (_parse_register(op, line_number) for op in operands)
+            low = rd
+        case 'I':  # rt, rs, imm
+            rt = _parse_register(operands[0], line_number)
+            rs = _parse_register(operands[1], line_number)
+            low = _imm4(_resolve(operands[2], labels, line_number), line_number)
+        case 'M':  # rt, offset(rs)
+            rt = _parse_register(operands[0], line_number)
+            match = _MEM_OPERAND.match(operands[1])
+            if match is None:
+                raise AssemblerError(line_number, f'expected offset($reg), got "{operands[1]}"')
+            rs = _parse_register(match.group(2), line_number)
+            low = _imm4(_resolve(match.group(1), labels, line_number), line_number)
+        case 'B':  # rs, rt, rótulo ou endereço absoluto (PC + 2 + offset << 1)
+            rs = _parse_register(operands[0], line_number)
+            rt = _parse_register(operands[1], line_number)
+            # Distância com wrap-around de 16 bits (o somador do PC também dá a volta)
+            distance = ((_resolve(operands[2], labels, line_number) - (pc + 2) + 0x8000) & 0xFFFF) - 0x8000
+            if distance % 2:
+                raise AssemblerError(line_number, f'branch target "{operands[2]}" is not 2-byte aligned')
+            low = _imm4(distance // 2, line_number)
+        case _:  # 'J': PC[15:12] | campo[10:0] << 1
+            target = _resolve(operands[0], labels, line_number)
+            if target % 2:
+                raise AssemblerError(line_number, f'jump target 0x{target:04X} is not 2-byte aligned')
+            if (target & 0xF000) != (pc & 0xF000):
+                raise AssemblerError(line_number, f'jump target 0x{target:04X} is outside the 4 KiB region of 0x{pc:04X}')
+            return (opcode << 12) | ((target & 0x0FFF) >> 1)
+
+    return (opcode << 12) | (rs << 8) | (rt << 4) | low
+
+
+def assemble(source: str) -> bytes:
+    """Monta o fonte e retorna a imagem binária (palavras big-endian a partir do endereço 0)"""
+    lines = _split_lines(source)
+
+    # Primeira passada: endereços dos rótulos
+    labels: dict[str, int] = {}
+    address = 0
+    for line_number, line_labels, text in lines:
+        for label in line_labels:
+            if label in labels:
+                raise AssemblerError(line_number, f'duplicate label "{label}"')
+            labels[label] = address
+        if not text:
+            continue
+        mnemonic, operands = _split_operands(text)
+        if mnemonic == '.org':
+            address = _parse_int(operands[0] if operands else '', line_number)
+        else:
+            address += _item_size(mnemonic, operands, line_number)
+
+    # Segunda passada: codificação
+    image = bytearray()
+    address = 0
+    for line_number, _, text in lines:
+        if not text:
+            continue
+        mnemonic, operands = _split_operands(text)
+        if mnemonic == '.org':
+            address = _parse_int(operands[0], line_number)
+            if address % 2:
+                raise AssemblerError(line_number, f'.org address 0x{address:04X} is not 2-byte aligned')
+            continue
+
+        if mnemonic == '.word':
+            words = [_resolve(op, labels, line_number) for op in operands]
+        else:
+            words = [encode(mnemonic, operands, address, labels, line_number)]
+
+        for word in words:
+            if not -0x8000 <= word <= 0xFFFF:
+                raise AssemblerError(line_number, f'word {word} does not fit in 16 bits')
+            if address + 2 > 0x10000:
+                raise AssemblerError(line_number, 'program does not fit in 64 KiB')
+            if len(image) < address:
+                image.extend(bytes(address - len(image)))
+            image[address:address + 2] = (word & 0xFFFF).to_bytes(2, 'big')
+            address += 2
+
+    return bytes(image)
+
+
+def disassemble_word(word: int, pc: int = 0) -> str:
+    """Desmonta uma instrução de 16 bits localizada no endereço `pc`"""
+    opcode, rs, rt, low = (word >> 12) & 0xF, (word >> 8) & 0xF, (word >> 4) & 0xF, word & 0xF
+    control = CONTROL_TABLE.get(opcode)
+    if control is None:
+        return f'.word 0x{word:04X}'
+
+    imm = low - 16 if low & 0x8 else low
+    match instruction_format(control):
+        case 'R':
+            return f'{control.mnemonic} ${low}, ${rs}, ${rt}'
+        case 'I':
+            return f'{control.mnemonic} ${rt}, ${rs}, {imm}'
+        case 'M':
+            return f'{control.mnemonic} ${rt}, {imm}(${rs})'
+        case 'B':
+            target = (pc + 2 + (imm << 1)) & 0xFFFF
+            return f'{control.mnemonic} ${rs}, ${rt}, 0x{target:04X}'
+        case _:
+            if word & 0x0800:  # Bit 11 é ignorado pelo hardware: sem forma canônica, mantém a palavra literal
+                return f'.word 0x{word:04X}'
+            target = (pc & 0xF000) | ((word << 1) & 0x0FFF)
+            return f'{control.mnemonic} 0x{target:04X}'
+
+
+def disassemble(image: bytes, base: int = 0) -> list[str]:
+    """Desmonta uma imagem binária, uma linha por instrução ("instrução  # endereço: palavra")
+
+    A saída é um fonte válido: assemble() sobre as linhas reproduz a imagem.
+    """
+    lines = [f'.org 0x{base:04X}'] if base else []
+    for offset in range(0, len(image) - 1, 2):
+        pc = base + offset
+        word = (image[offset] << 8) | image[offset + 1]
+        lines.append(f'{disassemble_word(word, pc):<24}# {pc:04X}: {word:04X}')
+    return lines
+
+
+def source_hash(source: bytes) -> str:
+    """Chave de cache: conteúdo do fonte mais a versão da ISA/montador"""
+    return hashlib.sha256(ISA_FINGERPRINT.encode() + b'\0' + source).hexdigest()
+
+
+def assemble_cached(source: bytes, cache_dir: str | os.PathLike) -> bytes:
+    """Monta o fonte reaproveitando a imagem em cache quando o conteúdo não mudou"""
+    cache_path = Path(cache_dir) / f'{source_hash(source)}.bin'
+    if cache_path.exists():
+        return cache_path.read_bytes()
+
+    image = assemble(source.decode())
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix(f'.tmp{os.getpid()}')
+    tmp_path.write_bytes(image)
+    os.replace(tmp_path, cache_path)  # Escrita atômica (vários processos podem compartilhar o cache)
+    return image
+
+
+def assemble_dir(
+        src_dir: str | os.PathLike,
+        out_dir: str | os.PathLike | None = None,
+        cache_dir: str | os.PathLike | None = None,
+        pattern: str = '*.s',
+) -> dict[Path, bytes]:
+    """Monta todos os fontes de um diretório, usando o cache de imagens por conteúdo
+
+    Retorna {caminho do fonte: imagem}. Com `out_dir`, também grava `<nome>.bin` para o loader.
+    """
+    src_dir = Path(src_dir)
+    cache_dir = Path(cache_dir) if cache_dir is not None else src_dir / '.asm_cache'
+
+    images = {}
+    for path in sorted(src_dir.glob(pattern)):
+        try:
+            images[path] = assemble_cached(path.read_bytes(), cache_dir)
+        except AssemblerError as e:
+            raise AssemblerError(e.line_number, f'{path}: {e.message}') from None
+
+        if out_dir is not None:
+            out_path = Path(out_dir) / f'{path.stem}.bin'
+            out_path.parent.mkdir(parents=True, exist_ok=True)
+            out_path.write_bytes(images[path])
+
+    return images
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Assembler for the mips16x ISA')
+    parser.add_argument('source', help='source file (.s), directory of sources, or image with -d')
+    parser.add_argument('-o', '--output', help='output image (file) or directory (when source is a directory)')
+    parser.add_argument('-d', '--disassemble', action='store_true', help='disassemble a binary image')
+    args = parser.parse_args()
+
+    if args.disassemble:
+        print('\n'.join(disassemble(Path(args.source).read_bytes())))
+    elif os.path.isdir(args.source):
+        for path, image in assemble_dir(args.source, args.output).items():
+            print(f'{path}: {len(image)} bytes')
+    else:
+        image = assemble(Path(args.source).read_text())
+        output = args.output or str(Path(args.source).with_suffix('.bin'))
+        Path(output).write_bytes(image)
+        print(f'{output}: {len(image)} bytes')
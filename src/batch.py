@@ -0,0 +1,182 @@
+"""Execução em lote de vários programas no mips16x, distribuídos entre processos
+
+Cada processo do pool elabora uma instância do datapath uma única vez e a
+reutiliza (com reset) para todos os programas que receber. Os jobs são
+submetidos em uma janela limitada (por padrão 2 por processo), então a lista de
+jobs pode ser um gerador longo; os resultados são devolvidos à medida que
+ficam prontos.
+"""
+import argparse
+import json
+import os
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import NamedTuple
+
+from isa import ArchState
+from loader import read_image
+from resultcache import ResultCache
+
+
+class Job(NamedTuple):
+    """Programa a executar: imagem, orçamento de ciclos, valores esperados e memória inicial (opcionais)"""
+    name: str
+    image: bytes
+    cycles: int
+    expected_registers: dict[int, int] | None = None  # {registrador: valor}
+    expected_memory: dict[int, int] | None = None  # {endereço: palavra de 16 bits}
+    memory: bytes | None = None  # Conteúdo inicial da memória de dados (a partir do endereço 0)
+
+
+class JobResult(NamedTuple):
+    name: str
+    state: ArchState | None
+    cycles: int
+    passed: bool | None  # None quando o job não tem valores esperados
+    elapsed: float
+    error: str | None = None
+    cached: bool = False  # Resultado obtido do ResultCache, sem simular
+
+
+# Instância aquecida do processo worker
+_cpu = None
+
+
+def _init_worker(imem_size: int, dmem_size: int) -> None:
+    global _cpu
+    from mips16x import build_mips16x
+
+    _cpu = build_mips16x(imem_size, dmem_size, trace_memory=False)
+
+
+def worker_cpu():
+    """Instância aquecida do processo (elaborada sob demanda quando usada fora do pool)"""
+    if _cpu is None:
+        _init_worker(65536, 65536)
+    return _cpu
+
+
+def check_state(state: ArchState, job: Job) -> bool | None:
+    """Compara o estado final com os valores esperados do job"""
+    if job.expected_registers is None and job.expected_memory is None:
+        return None
+
+    for reg, value in (job.expected_registers or {}).items():
+        if state.registers[reg] != value & 0xFFFF:
+            return False
+
+    memory = state.memory
+    for addr, value in (job.expected_memory or {}).items():
+        if (memory[addr % len(memory)] << 8) | memory[(addr + 1) % len(memory)] != value & 0xFFFF:
+            return False
+
+    return True
+
+
+def run_job(job: Job) -> JobResult:
+    """Executa um job na instância do worker (elaborada sob demanda fora do pool)"""
+    cpu = worker_cpu()
+    start = time.perf_counter()
+    try:
+        cpu.reset(clear_memory=True)
+        cpu.load_program(job.image)
+        if job.memory:
+            cpu.memory.load(job.memory)
+        result = cpu.run(job.cycles)  # Para no laço de fim de programa (JUMP para si mesmo)
+        state = cpu.state()
+    except Exception as e:  # O lote continua mesmo que um programa falhe
+        return JobResult(job.name, None, 0, False, time.perf_counter() - start, f'{type(e).__name__}: {e}')
+
+    return JobResult(job.name, state, result.cycles, check_state(state, job), time.perf_counter() - start)
+
+
+def _completed(pending: dict[Future, str | None], cache: ResultCache | None) -> Iterator[JobResult]:
+    """Espera pelo menos um job em andamento terminar e devolve os que terminaram"""
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        key = pending.pop(future)
+        result = future.result()
+        if cache is not None and result.error is None:
+            cache.put(key, result.state, result.cycles)
+        yield result
+
+
+def run_batch(
+        jobs: Iterable[Job],
+        workers: int | None = None,
+        imem_size: int = 65536,
+        dmem_size: int = 65536,
+        cache: ResultCache | None = None,
+        window: int | None = None,
+) -> Iterator[JobResult]:
+    """Distribui os jobs entre `workers` processos e devolve os resultados conforme terminam
+
+    No máximo `window` jobs (padrão: 2 * workers) ficam submetidos ao pool ao
+    mesmo tempo; o próximo só é lido de `jobs` quando algum termina.
+
+    Com `cache`, os jobs já simulados (mesmo programa, memória inicial, ciclos e
+    modelo) são respondidos do cache sem ir para o pool.
+    """
+    workers = workers or os.cpu_count()
+    window = window or 2 * workers
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(imem_size, dmem_size),
+    ) as executor:
+        pending: dict[Future, str | None] = {}
+        for job in jobs:
+            if cache is not None:
+                key = cache.key(job.image, job.cycles, job.memory or b'', imem_size, dmem_size)
+                hit = cache.get(key)
+                if hit is not None:
+                    state, cycles = hit
+                    yield JobResult(job.name, state, cycles, check_state(state, job), 0.0, cached=True)
+                    continue
+            else:
+                key = None
+            pending[executor.submit(run_job, job)] = key
+            if len(pending) >= window:
+                yield from _completed(pending, cache)
+
+        while pending:
+            yield from _completed(pending, cache)
+
+
+def load_job(path: str, cycles: int) -> Job:
+    """Cria um job a partir de um arquivo de imagem (qualquer formato aceito pelo loader)"""
+    image = bytearray()
+    for address, data in read_image(path):
+        if len(image) < address + len(data):
+            image.extend(bytes(address + len(data) - len(image)))
+        image[address:address + len(data)] = data
+
+    return Job(path, bytes(image), cycles)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run many mips16x programs in parallel')
+    parser.add_argument('images', nargs='+', help='program images (.bin, .hex, .mem or .s)')
+    parser.add_argument('-c', '--cycles', type=int, default=1000, help='cycle budget per program')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='number of worker processes')
+    parser.add_argument(
+        '--cache', default=os.environ.get('MIPS16X_RESULT_CACHE'),
+        help='result cache directory (default: $MIPS16X_RESULT_CACHE, disabled if unset)',
+    )
+    parser.add_argument('--cache-size', type=int, default=256, help='result cache size limit in MiB')
+    args = parser.parse_args()
+
+    cache = ResultCache(args.cache, args.cache_size << 20) if args.cache else None
+    jobs = (load_job(path, args.cycles) for path in args.images)
+    for result in run_batch(jobs, args.workers, cache=cache):
+        print(json.dumps({
+            'name': result.name,
+            'cycles': result.cycles,
+            'passed': result.passed,
+            'cached': result.cached,
+            'elapsed': round(result.elapsed, 6),
+            'error': result.error,
+            'pc': result.state.pc if result.state else None,
+            'registers': list(result.state.registers) if result.state else None,
+        }), flush=True)
@@ -0,0 +1,314 @@
+"""Benchmarks do modelo do mips16x
+
+Executa um conjunto de cargas de referência (os programas dos testbenches e
+kernels sintéticos de ALU, memória e desvios) em cada motor de simulação, com
+e sem rastreamento (VCD em streaming de todos os barramentos), e mede:
+
+- ciclos simulados por segundo;
+- avaliações de barramento por ciclo (contador de delta cycles do LevelizedComponent);
+- instâncias de BitBusValue criadas por ciclo (motores com netlist);
+- memória alocada, com tracemalloc: blocos que continuam vivos por ciclo e
+  pico de bytes durante a execução (todos os motores, inclusive isa);
+- pico de memória (RSS) do processo.
+
+Cada caso roda em um processo novo, para que o pico de RSS seja só dele. Os
+resultados vão para JSON e podem ser comparados com um baseline salvo:
+
+    python bench.py -o baseline.json
+    python bench.py -o atual.json --baseline baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from flote.backend.python.core.buses import BitBusValue
+
+from assembler import assemble
+
+# Palavras dos programas de testbench_complete.py e testbench_extended.py (repetidos com um JUMP 0 no final)
+COMPLETE_PROGRAM = [0x5015, 0x5023, 0x0123, 0x1324, 0x4215]
+EXTENDED_PROGRAM = [
+    0x5015, 0x5023, 0x0123, 0x1324, 0x5057, 0x5066, 0x2567, 0x3568,
+    0x4219, 0x412A, 0x50B4, 0x7B10, 0x7B22, 0x6BC0, 0x6BD2, 0x50E7,
+]
+
+ALU_LOOP = '''
+loop:   ADDI $1, $1, 1
+        ADD  $2, $2, $1
+        SUB  $3, $2, $1
+        AND  $4, $3, $2
+        OR   $5, $4, $1
+        SLT  $6, $1, $2
+        JUMP loop
+'''
+
+MEMORY_KERNEL = '''
+loop:   ADDI $1, $1, 4
+        SW   $1, 0($1)
+        LW   $2, 0($1)
+        SW   $2, 2($1)
+        LW   $3, 2($1)
+        ADD  $4, $4, $3
+        JUMP loop
+'''
+
+BRANCH_KERNEL = '''
+        ADDI $7, $0, 5
+outer:  ADDI $1, $0, 0
+inner:  ADDI $1, $1, 1
+        BEQ  $1, $7, done
+        SLT  $2, $1, $7
+        BEQ  $2, $0, done
+        JUMP inner
+done:   ADDI $3, $3, 1
+        BEQ  $0, $0, outer
+'''
+
+
+def _program(words: list[int]) -> bytes:
+    return b''.join(word.to_bytes(2, 'big') for word in words + [0x9000])  # JUMP 0
+
+
+WORKLOADS = {
+    'complete': lambda: _program(COMPLETE_PROGRAM),
+    'extended': lambda: _program(EXTENDED_PROGRAM),
+    'alu_loop': lambda: assemble(ALU_LOOP),
+    'memory': lambda: assemble(MEMORY_KERNEL),
+    'branch': lambda: assemble(BRANCH_KERNEL),
+}
+
+# Motores e ciclos simulados por caso (multiplicados por --scale)
+ENGINES = {
+    'event': 2_000,  # Netlist com a propagação por eventos do flote
+    'levelized': 2_000,  # Netlist com o escalonamento levelizado (padrão)
+    'compiled': 50_000,  # Netlist compilada (compiler.py)
+    'isa': 500_000,  # Simulador funcional (isa.py), sem barramentos
+}
+
+# Ciclos usados só para medir as alocações (a medição deixa a simulação mais lenta)
+ALLOCATION_CYCLES = 200
+
+
+def _count_bit_values(run, cycles: int) -> int:
+    """Executa run(cycles) contando as instâncias de BitBusValue criadas"""
+    count = 0
+    original = BitBusValue.__init__
+
+    def counting_init(self, value=None):
+        nonlocal count
+        count += 1
+        original(self, value)
+
+    BitBusValue.__init__ = counting_init
+    try:
+        run(cycles)
+    finally:
+        BitBusValue.__init__ = original
+    return count
+
+
+def _trace_allocations(run, cycles: int) -> tuple[int, int]:
+    """Executa run(cycles) sob tracemalloc: blocos alocados ainda vivos ao final e pico de bytes alocados"""
+    tracemalloc.start()
+    try:
+        run(cycles)
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+    finally:
+        tracemalloc.stop()
+    return len(snapshot.traces), peak
+
+
+def run_case(workload: str, engine: str, trace: bool, cycles: int) -> dict:
+    """Mede um caso (executado no processo worker)"""
+    from isa import IsaSimulator
+    from mips16x import build_mips16x
+    from vcd import VcdWriter
+
+    image = WORKLOADS[workload]()
+    result = {'workload': workload, 'engine': engine, 'trace': trace, 'cycles': cycles}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = None
+        if engine == 'isa':
+            sim = IsaSimulator()
+            sim.load_program(image)
+            run = sim.run
+            component = None
+        else:
+            cpu = build_mips16x(trace_memory=trace, levelized=engine != 'event')
+            cpu.load_program(image)
+            component = cpu.component
+            if trace:
+                writer = VcdWriter(os.path.join(tmp, 'trace.vcd'), component)
+            run = _netlist_runner(cpu, engine, writer)
+
+        # Aquecimento sem medição: pool de 16 bits, primeira execução da netlist compilada, blocos do isa
+        run(ALLOCATION_CYCLES)
+
+        if engine != 'isa':
+            bit_values = _count_bit_values(run, ALLOCATION_CYCLES)
+            result['bit_values_per_cycle'] = bit_values / ALLOCATION_CYCLES
+        else:
+            result['bit_values_per_cycle'] = None
+
+        blocks, peak = _trace_allocations(run, ALLOCATION_CYCLES)
+        result['retained_blocks_per_cycle'] = blocks / ALLOCATION_CYCLES
+        result['allocation_peak_kib'] = peak / 1024
+
+        if component is not None:
+            component.reset_counters()
+
+        start = time.perf_counter()
+        run(cycles)
+        elapsed = time.perf_counter() - start
+
+        if writer is not None:
+            writer.close()
+            result['trace_bytes'] = os.path.getsize(os.path.join(tmp, 'trace.vcd'))
+
+    result['seconds'] = elapsed
+    result['cycles_per_second'] = cycles / elapsed
+    if component is not None and engine != 'compiled':
+        result['evaluations_per_cycle'] = component.delta_cycles / cycles
+        result['redundant_evaluations_per_cycle'] = component.redundant_deltas / cycles
+    else:
+        result['evaluations_per_cycle'] = None
+    result['warmup_cycles'] = (3 if engine != 'isa' else 2) * ALLOCATION_CYCLES
+    result['peak_rss_kib'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return result
+
+
+def _netlist_runner(cpu, engine: str, writer):
+    """Função run(ciclos) para a netlist, amostrando as duas fases quando há `writer`"""
+    if engine == 'compiled':
+        compiled = cpu.compile()
+        if writer is None:
+            return compiled.run
+
+        elapsed_cycles = 0
+
+        def run_traced(cycles: int) -> None:
+            nonlocal elapsed_cycles
+            base = elapsed_cycles
+            compiled.run(cycles, lambda cycle, level: writer.sample(2 * (base + cycle) + level))
+            elapsed_cycles += cycles
+
+        return run_traced
+
+    if writer is None:
+        return cpu.cycle
+
+    update_signals = cpu.component.update_signals
+    elapsed_cycles = 0
+
+    def run_interpreted(cycles: int) -> None:
+        nonlocal elapsed_cycles
+        for _ in range(cycles):
+            update_signals({'clk': '0'})
+            writer.sample(2 * elapsed_cycles)
+            update_signals({'clk': '1'})
+            writer.sample(2 * elapsed_cycles + 1)
+            elapsed_cycles += 1
+
+    return run_interpreted
+
+
+def run_benchmarks(
+        workloads: list[str] | None = None,
+        engines: list[str] | None = None,
+        scale: float = 1.0,
+) -> dict:
+    """Executa todos os casos, cada um em um processo novo, e retorna o relatório"""
+    cases = []
+    for workload in workloads or WORKLOADS:
+        for engine in engines or ENGINES:
+            for trace in ((False,) if engine == 'isa' else (False, True)):
+                cycles = max(1, int(ENGINES[engine] * scale / (10 if trace else 1)))
+                cases.append((workload, engine, trace, cycles))
+
+    results = []
+    context = get_context('spawn')
+    for case in cases:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            result = executor.submit(run_case, *case).result()
+        results.append(result)
+        print(_format(result), file=sys.stderr, flush=True)
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'scale': scale,
+        },
+        'results': results,
+    }
+
+
+def _key(result: dict) -> tuple:
+    return result['workload'], result['engine'], result['trace']
+
+
+def _format(result: dict) -> str:
+    evaluations = result['evaluations_per_cycle']
+    bit_values = result['bit_values_per_cycle']
+    return (
+        f'{result["workload"]:>9} {result["engine"]:>9} {"trace" if result["trace"] else "-":>5} '
+        f'{result["cycles_per_second"]:>12,.0f} cycles/s '
+        f'{"-" if evaluations is None else f"{evaluations:.1f}":>6} evals/cycle '
+        f'{"-" if bit_values is None else f"{bit_values:.1f}":>6} BitBusValues/cycle '
+        f'{result["retained_blocks_per_cycle"]:>6.1f} blocks/cycle '
+        f'{result["allocation_peak_kib"]:>7.1f} KiB alloc peak '
+        f'{result["peak_rss_kib"] / 1024:>7.1f} MiB'
+    )
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Imprime a variação de ciclos/s em relação ao baseline e retorna os casos que pioraram além da tolerância"""
+    previous = {_key(result): result for result in baseline['results']}
+    regressions = []
+    for result in report['results']:
+        old = previous.get(_key(result))
+        if old is None:
+            continue
+
+        ratio = result['cycles_per_second'] / old['cycles_per_second']
+        name = '/'.join(str(part) for part in _key(result))
+        print(f'{name:>32}: {ratio:6.2f}x cycles/s, peak RSS {result["peak_rss_kib"] - old["peak_rss_kib"]:+,} KiB')
+        if ratio < 1 - tolerance:
+            regressions.append(name)
+
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the mips16x simulation engines')
+    parser.add_argument('-o', '--output', help='JSON file for the results')
+    parser.add_argument('-b', '--baseline', help='JSON results to compare against')
+    parser.add_argument('-w', '--workloads', nargs='*', choices=list(WORKLOADS), default=None)
+    parser.add_argument('-e', '--engines', nargs='*', choices=list(ENGINES), default=None)
+    parser.add_argument('-s', '--scale', type=float, default=1.0, help='multiplier for the simulated cycles')
+    parser.add_argument('-t', '--tolerance', type=float, default=0.10, help='allowed cycles/s slowdown vs baseline')
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.workloads, args.engines, args.scale)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f'Slower than baseline: {", ".join(regressions)}', file=sys.stderr)
+            sys.exit(1)
@@ -0,0 +1,400 @@
+"""Trace binário colunar, com índice de chunks, e ferramenta de consulta
+
+Alternativa ao VCD para pós-processamento: cada barramento vira uma coluna de
+mudanças (ciclo, valor inteiro), guardada em chunks com codificação delta
+(varints). No fim do arquivo ficam a tabela de barramentos e o índice dos chunks
+(ciclos e valores extremos, posição no arquivo), então as consultas leem só os
+chunks necessários:
+
+    reader = TraceReader('run.trace')
+    reader.value_at('pc', 1000)
+    reader.cycles_where('mem_write_enable', 1)
+    reader.export_vcd('janela.vcd', start=900, end=1100, include=['pc', 'reg_*'])
+
+Layout: MAGIC | chunks | tabela de barramentos | índice | rodapé (_FOOTER).
+"""
+import argparse
+import bisect
+import heapq
+import os
+import struct
+from collections.abc import Iterable, Iterator
+from typing import NamedTuple
+
+from flote.backend.python.core.buses import BaseBus
+from flote.backend.python.core.component import Component
+from flote.testbench import VALID_UNITS
+
+from codec import to_int
+from vcd import match_ids, select_buses, vcd_change, vcd_header, vcd_identifier
+
+MAGIC = b'M16TRACE'
+FORMAT_VERSION = 1
+
+# Rodapé: posição da tabela de barramentos, posição do índice, último ciclo amostrado, versão
+_FOOTER = struct.Struct('<QQqH8s')
+# Entrada do índice: barramento, primeiro/último ciclo, primeiro/último/menor/maior valor, posição, tamanho, mudanças
+_INDEX_ENTRY = struct.Struct('<IqqQQQQQII')
+
+
+class ChunkInfo(NamedTuple):
+    bus: int
+    first_cycle: int
+    last_cycle: int
+    first_value: int
+    last_value: int
+    min_value: int
+    max_value: int
+    offset: int
+    size: int
+    count: int
+
+
+def _encode_varint(value: int, out: bytearray) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _decode_varints(data: bytes) -> Iterator[int]:
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            yield value
+            value = shift = 0
+
+
+def _zigzag(value: int) -> int:
+    return value << 1 if value >= 0 else ((-value) << 1) - 1
+
+
+def _unzigzag(value: int) -> int:
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+def encode_chunk(changes: list[tuple[int, int]]) -> bytes:
+    """Codifica as mudanças (ciclo, valor) de um chunk: deltas de ciclo e de valor em varint"""
+    out = bytearray()
+    previous_cycle, previous_value = changes[0][0], 0
+    for cycle, value in changes:
+        _encode_varint(cycle - previous_cycle, out)
+        _encode_varint(_zigzag(value - previous_value), out)
+        previous_cycle, previous_value = cycle, value
+    return bytes(out)
+
+
+def decode_chunk(data: bytes, first_cycle: int) -> list[tuple[int, int]]:
+    """Inverso de encode_chunk"""
+    changes = []
+    cycle, value = first_cycle, 0
+    numbers = _decode_varints(data)
+    for cycle_delta in numbers:
+        cycle += cycle_delta
+        value += _unzigzag(next(numbers))
+        changes.append((cycle, value))
+    return changes
+
+
+class TraceWriter:
+    """Grava as mudanças dos barramentos selecionados em colunas com chunks indexados
+
+    Mesma interface de vcd.VcdWriter (sample/close), então também serve de
+    `sink` para vcd.StreamingTestBench. Cada coluna guarda no máximo
+    `chunk_size` mudanças em memória antes de gravá-las no arquivo.
+    """
+    def __init__(
+            self,
+            path: str | os.PathLike,
+            component: Component,
+            include: Iterable[str] | None = None,
+            exclude: Iterable[str] | None = None,
+            time_unit: str = 'ns',
+            chunk_size: int = 4096,
+    ) -> None:
+        if time_unit not in VALID_UNITS:
+            raise ValueError(f'Invalid time unit "{time_unit}". Valid units are: {VALID_UNITS}')
+
+        self.component = component
+        self.include = include
+        self.exclude = exclude
+        self.time_unit = time_unit
+        self.chunk_size = chunk_size
+        self.file = open(path, 'wb')
+        self.file.write(MAGIC + struct.pack('<H', FORMAT_VERSION))
+        self.buses: list[BaseBus] | None = None
+        self._columns: list[list[tuple[int, int]]] = []
+        self._last: list[int | None] = []
+        self._flushed: list[int | None] = []  # Último valor já gravado em chunk, por coluna
+        self._index: list[ChunkInfo] = []
+        self._time: int | None = None
+
+    def __enter__(self) -> 'TraceWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _select(self) -> None:
+        self.buses = select_buses(self.component.buses, self.include, self.exclude)
+        for bus in self.buses:
+            if len(bus.value.raw_value) > 64:
+                raise ValueError(f'Bus "{bus.id}" is wider than 64 bits')
+        self._columns = [[] for _ in self.buses]
+        self._last = [None] * len(self.buses)
+        self._flushed = [None] * len(self.buses)
+
+    def _flush(self, bus: int) -> None:
+        changes = self._columns[bus]
+        data = encode_chunk(changes)
+        values = [value for _, value in changes]
+        self._index.append(ChunkInfo(
+            bus, changes[0][0], changes[-1][0], values[0], values[-1], min(values), max(values),
+            self.file.tell(), len(data), len(changes),
+        ))
+        self.file.write(data)
+        self._flushed[bus] = values[-1]
+        changes.clear()
+
+    def sample(self, time: int) -> None:
+        """Registra os valores atuais no ciclo (ou instante) `time`"""
+        if self.buses is None:
+            self._select()
+        if self._time is not None and time < self._time:
+            raise ValueError(f'Samples must be in time order ({time} after {self._time})')
+        self._time = time
+
+        last = self._last
+        for i, bus in enumerate(self.buses):
+            value = to_int(bus.value.raw_value)
+            if value != last[i]:
+                last[i] = value
+                column = self._columns[i]
+                if column and column[-1][0] == time:  # Várias amostras no mesmo instante: vale a última
+                    previous = column[-2][1] if len(column) > 1 else self._flushed[i]
+                    if value == previous:
+                        column.pop()
+                    else:
+                        column[-1] = (time, value)
+                else:
+                    # O chunk só é gravado quando chega um instante novo: a última mudança ainda pode ser reescrita
+                    if len(column) >= self.chunk_size:
+                        self._flush(i)
+                    column.append((time, value))
+
+    def close(self, end_time: int | None = None) -> None:
+        """Grava os chunks pendentes, a tabela de barramentos, o índice e o rodapé"""
+        if self.file.closed:
+            return
+        if self.buses is None:
+            self._select()
+
+        for i, column in enumerate(self._columns):
+            if column:
+                self._flush(i)
+
+        table_offset = self.file.tell()
+        table = bytearray(struct.pack('<I', len(self.buses)))
+        for bus in self.buses:
+            name = bus.id.encode()
+            table += struct.pack('<HH', len(name), len(bus.value.raw_value)) + name
+        unit = self.time_unit.encode()
+        table += struct.pack('<B', len(unit)) + unit
+        self.file.write(table)
+
+        index_offset = self.file.tell()
+        self.file.write(struct.pack('<I', len(self._index)))
+        for entry in self._index:
+            self.file.write(_INDEX_ENTRY.pack(*entry))
+
+        end = max(t for t in (end_time, self._time, 0) if t is not None)
+        self.file.write(_FOOTER.pack(table_offset, index_offset, end, FORMAT_VERSION, MAGIC))
+        self.file.close()
+
+
+class TraceReader:
+    """Consultas sobre um arquivo de TraceWriter, lendo apenas os chunks necessários"""
+    def __init__(self, path: str | os.PathLike) -> None:
+        self.file = open(path, 'rb')
+        if self.file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'"{path}" is not a mips16x binary trace')
+
+        self.file.seek(-_FOOTER.size, os.SEEK_END)
+        table_offset, index_offset, self.end_cycle, version, magic = _FOOTER.unpack(self.file.read(_FOOTER.size))
+        if magic != MAGIC:
+            raise ValueError(f'"{path}" is truncated (trace was not closed)')
+        if version != FORMAT_VERSION:
+            raise ValueError(f'Unsupported trace format version {version}')
+
+        self.file.seek(table_offset)
+        self.buses: dict[str, int] = {}
+        self.widths: list[int] = []
+        count, = struct.unpack('<I', self.file.read(4))
+        for i in range(count):
+            length, width = struct.unpack('<HH', self.file.read(4))
+            self.buses[self.file.read(length).decode()] = i
+            self.widths.append(width)
+        length, = struct.unpack('<B', self.file.read(1))
+        self.time_unit = self.file.read(length).decode()
+
+        self.file.seek(index_offset)
+        count, = struct.unpack('<I', self.file.read(4))
+        self.chunks: list[list[ChunkInfo]] = [[] for _ in self.widths]
+        for _ in range(count):
+            entry = ChunkInfo(*_INDEX_ENTRY.unpack(self.file.read(_INDEX_ENTRY.size)))
+            self.chunks[entry.bus].append(entry)
+        self._starts = [[chunk.first_cycle for chunk in chunks] for chunks in self.chunks]
+
+    def __enter__(self) -> 'TraceReader':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.file.close()
+
+    def _bus(self, bus_id: str) -> int:
+        try:
+            return self.buses[bus_id]
+        except KeyError:
+            raise KeyError(f'Bus "{bus_id}" is not in the trace') from None
+
+    def _read_chunk(self, chunk: ChunkInfo) -> list[tuple[int, int]]:
+        self.file.seek(chunk.offset)
+        return decode_chunk(self.file.read(chunk.size), chunk.first_cycle)
+
+    def value_at(self, bus_id: str, cycle: int) -> int | None:
+        """Valor do barramento no ciclo `cycle` (None antes da primeira amostra)"""
+        bus = self._bus(bus_id)
+        position = bisect.bisect_right(self._starts[bus], cycle) - 1
+        if position < 0:
+            return None
+
+        chunk = self.chunks[bus][position]
+        if cycle >= chunk.last_cycle:
+            return chunk.last_value
+
+        changes = self._read_chunk(chunk)
+        return changes[bisect.bisect_right(changes, (cycle, float('inf'))) - 1][1]
+
+    def changes(self, bus_id: str, start: int = 0, end: int | None = None) -> Iterator[tuple[int, int]]:
+        """Mudanças (ciclo, valor) em [start, end], precedidas pelo valor vigente em `start`"""
+        bus = self._bus(bus_id)
+        end = self.end_cycle if end is None else end
+        chunks = self.chunks[bus]
+        position = max(bisect.bisect_right(self._starts[bus], start) - 1, 0)
+
+        current = self.value_at(bus_id, start)
+        if current is not None:
+            yield start, current
+        for chunk in chunks[position:]:
+            if chunk.first_cycle > end:
+                break
+            for cycle, value in self._read_chunk(chunk):
+                if start < cycle <= end:
+                    yield cycle, value
+
+    def intervals_where(self, bus_id: str, value: int) -> Iterator[tuple[int, int]]:
+        """Intervalos [início, fim) em que o barramento valeu `value`
+
+        Chunks cujo intervalo de valores não contém `value` não são lidos.
+        """
+        bus = self._bus(bus_id)
+        chunks = self.chunks[bus]
+        start = None
+        for position, chunk in enumerate(chunks):
+            if start is None and not chunk.min_value <= value <= chunk.max_value:
+                continue
+
+            if start is not None and not chunk.min_value <= value <= chunk.max_value:
+                yield start, chunk.first_cycle  # O valor muda logo na primeira entrada do chunk
+                start = None
+                continue
+
+            for cycle, current in self._read_chunk(chunk):
+                if current == value and start is None:
+                    start = cycle
+                elif current != value and start is not None:
+                    yield start, cycle
+                    start = None
+
+        if start is not None:
+            yield start, self.end_cycle + 1
+
+    def cycles_where(self, bus_id: str, value: int) -> Iterator[int]:
+        """Todos os ciclos amostrados em que o barramento valeu `value`"""
+        for start, end in self.intervals_where(bus_id, value):
+            yield from range(start, end)
+
+    def export_vcd(
+            self,
+            path: str | os.PathLike,
+            start: int = 0,
+            end: int | None = None,
+            include: Iterable[str] | None = None,
+            exclude: Iterable[str] | None = None,
+            module: str = 'mips16x',
+    ) -> None:
+        """Gera um VCD só com a janela [start, end] e os barramentos selecionados"""
+        end = self.end_cycle if end is None else end
+        selected = match_ids(self.buses, include, exclude)
+        codes = {bus_id: vcd_identifier(i) for i, bus_id in enumerate(selected)}
+
+        def stream(i: int, bus_id: str) -> Iterator[tuple[int, int, int]]:
+            for cycle, value in self.changes(bus_id, start, end):
+                yield cycle, i, value
+
+        streams = [stream(i, bus_id) for i, bus_id in enumerate(selected)]
+        with open(path, 'w', buffering=1 << 16) as f:
+            f.write(vcd_header(module, [(codes[b], b, self.widths[self.buses[b]]) for b in selected], self.time_unit))
+            time = None
+            for cycle, i, value in heapq.merge(*streams):
+                if cycle != time:
+                    f.write(f'#{cycle}\n')
+                    time = cycle
+                bus_id = selected[i]
+                f.write(vcd_change(codes[bus_id], format(value, f'0{self.widths[self.buses[bus_id]]}b')))
+            if time != end:
+                f.write(f'#{end}\n')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Query a mips16x binary trace')
+    parser.add_argument('trace', help='trace file written by TraceWriter')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('buses', help='list traced buses')
+
+    value_parser = commands.add_parser('value', help='value of a bus at a cycle')
+    value_parser.add_argument('bus')
+    value_parser.add_argument('cycle', type=int)
+
+    where_parser = commands.add_parser('where', help='cycle intervals where a bus had a value')
+    where_parser.add_argument('bus')
+    where_parser.add_argument('value', type=lambda text: int(text, 0))
+
+    vcd_parser = commands.add_parser('vcd', help='export a window as VCD')
+    vcd_parser.add_argument('output')
+    vcd_parser.add_argument('--start', type=int, default=0)
+    vcd_parser.add_argument('--end', type=int, default=None)
+    vcd_parser.add_argument('--include', nargs='*', default=None, help='bus id patterns to export')
+    vcd_parser.add_argument('--exclude', nargs='*', default=None, help='bus id patterns to skip')
+    args = parser.parse_args()
+
+    with TraceReader(args.trace) as reader:
+        match args.command:
+            case 'buses':
+                for bus_id, i in reader.buses.items():
+                    print(f'{bus_id} ({reader.widths[i]} bits, {len(reader.chunks[i])} chunks)')
+            case 'value':
+                value = reader.value_at(args.bus, args.cycle)
+                print('-' if value is None else f'{value} (0x{value:X})')
+            case 'where':
+                for start, end in reader.intervals_where(args.bus, args.value):
+                    print(f'{start}..{end - 1}')
+            case 'vcd':
+                reader.export_vcd(args.output, args.start, args.end, args.include, args.exclude)
@@ -0,0 +1,94 @@
+from itertools import product
+
+from flote.backend.python.core.buses import BitBusValue
+
+# Larguras de barramento usadas pelo datapath do mips16x
+WIDTHS = (1, 3, 4, 8, 16)
+
+MASKS: dict[int, int] = {width: (1 << width) - 1 for width in WIDTHS}
+
+# Tabelas pré-calculadas (construídas uma única vez na importação)
+# _BITS[width][n] -> lista de bools (MSB primeiro) que representa n
+# _INTS[tuple(bits)] -> inteiro correspondente (todas as larguras juntas)
+# As listas de _BITS são compartilhadas: nunca devem ser modificadas in-place.
+_BITS: dict[int, list[list[bool]]] = {}
+_INTS: dict[tuple[bool, ...], int] = {}
+
+
+class FrozenBitBusValue(BitBusValue):
+    """BitBusValue do pool de valores internados: compartilhado, não pode ser reatribuído"""
+    def __setattr__(self, name: str, value) -> None:
+        if 'raw_value' in self.__dict__:
+            raise AttributeError('Interned BitBusValue is immutable')
+        super().__setattr__(name, value)
+
+
+class _LazyPool(dict):
+    """Pool de uma largura larga: cada FrozenBitBusValue é criado no primeiro uso e memoizado"""
+    def __init__(self, bits: list[list[bool]]) -> None:
+        super().__init__()
+        self.bits = bits
+
+    def __missing__(self, n: int) -> FrozenBitBusValue:
+        value = self[n] = FrozenBitBusValue(self.bits[n])
+        return value
+
+
+# Larguras cujo pool é preenchido sob demanda (o de 16 bits inteiro custaria ~15 MiB)
+LAZY_WIDTHS = (16,)
+
+# _VALUES[width][n] -> FrozenBitBusValue que envolve _BITS[width][n] (flyweight)
+_VALUES: dict[int, list[FrozenBitBusValue] | _LazyPool] = {}
+
+for _width in WIDTHS:
+    _BITS[_width] = [list(bits) for bits in product((False, True), repeat=_width)]
+    if _width in LAZY_WIDTHS:
+        _VALUES[_width] = _LazyPool(_BITS[_width])
+    else:
+        _VALUES[_width] = [FrozenBitBusValue(bits) for bits in _BITS[_width]]
+    for _n, _bits in enumerate(_BITS[_width]):
+        _INTS[tuple(_bits)] = _n
+
+
+def to_int(bits: list[bool]) -> int:
+    """Converte uma lista de bools (MSB primeiro) em inteiro sem sinal"""
+    try:
+        return _INTS[tuple(bits)]
+    except KeyError:  # Largura fora das tabelas
+        value = 0
+        for bit in bits:
+            value = (value << 1) | bit
+        return value
+
+
+def from_int(value: int, width: int) -> list[bool]:
+    """Converte um inteiro em lista de bools de `width` bits (com wrap-around)
+
+    A lista retornada pode ser compartilhada e não deve ser modificada.
+    """
+    table = _BITS.get(width)
+    if table is not None:
+        return table[value & MASKS[width]]
+
+    value &= (1 << width) - 1
+    return [bool((value >> shift) & 1) for shift in range(width - 1, -1, -1)]
+
+
+def bit_value(value: int, width: int) -> BitBusValue:
+    """BitBusValue de `width` bits para um inteiro (com wrap-around)
+
+    Nas larguras de WIDTHS retorna a instância compartilhada do pool, sem alocar.
+    """
+    table = _VALUES.get(width)
+    if table is not None:
+        return table[value & MASKS[width]]
+
+    return BitBusValue(from_int(value, width))
+
+
+def intern_bits(bits: list[bool]) -> BitBusValue:
+    """Instância compartilhada do pool com os mesmos bits (ou um novo BitBusValue fora de WIDTHS)"""
+    try:
+        return _VALUES[len(bits)][_INTS[tuple(bits)]]
+    except KeyError:
+        return BitBusValue(list(bits))
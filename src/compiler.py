@@ -0,0 +1,422 @@
+"""Compilação da netlist elaborada em código Python linear
+
+Percorre o escalonamento levelizado de um LevelizedComponent e gera, para cada
+barramento, o trecho de código equivalente ao seu helper de abstract.py, agora
+sobre variáveis locais inteiras. O ciclo de clock inteiro (fase baixa e fase
+alta) vira o corpo de um único laço, sem AbsAssignment, partial ou BitBusValue.
+
+Cada helper tem um template registrado em TEMPLATES; a netlist só compila se
+todos os helpers usados tiverem template. O código gerado fica em cache no
+disco do usuário (código objeto serializado), indexado pelo hash do próprio
+código gerado: qualquer mudança no gerador ou na netlist muda a chave, sem
+versão mantida à mão.
+"""
+import hashlib
+import marshal
+import os
+import sys
+from collections.abc import Callable
+from pathlib import Path
+
+from flote.backend.python.core.buses import BaseBus
+
+import abstract
+from abstract import ClockBus
+from codec import _VALUES, bit_value, to_int
+from schedule import LevelizedComponent, fan_in
+from storage import ByteMemory
+
+# Diretório de cache do usuário (XDG), fora da árvore de fontes
+DEFAULT_CACHE_DIR = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'mips16x' / 'netlist'
+
+
+class CompileContext:
+    """Estado da geração: constantes ligadas ao código e fase de clock atual"""
+    def __init__(self) -> None:
+        self.constants: list[object] = []
+        self._names: dict[object, str] = {}
+        self.rising = False
+
+    def const(self, value: object) -> str:
+        """Nome da constante que o código gerado usa para `value`
+
+        Tuplas são reaproveitadas por valor; os demais objetos, por identidade.
+        """
+        key = value if isinstance(value, tuple) else id(value)
+        name = self._names.get(key)
+        if name is None:
+            name = self._names[key] = f'k_{len(self.constants)}'
+            self.constants.append(value)
+        return name
+
+
+def var(bus: BaseBus) -> str:
+    """Nome da variável local de um barramento"""
+    return f'v_{bus.id}'
+
+
+def width(bus: BaseBus) -> int:
+    return len(bus.value.raw_value)
+
+
+# Helper de abstract.py -> função que gera as linhas de código do barramento `out`
+Template = Callable[[BaseBus, tuple, CompileContext], list[str]]
+TEMPLATES: dict[Callable, Template] = {}
+
+
+def template(*helpers: Callable) -> Callable[[Template], Template]:
+    """Registra o gerador de código de um ou mais helpers"""
+    def register(generator: Template) -> Template:
+        for helper in helpers:
+            TEMPLATES[helper] = generator
+        return generator
+
+    return register
+
+
+def _assign(out: BaseBus, expression: str) -> list[str]:
+    return [f'{var(out)} = {expression}']
+
+
+@template(abstract.buffer)
+def _buffer(out, args, ctx):
+    return _assign(out, var(args[0]))
+
+
+@template(abstract.add_bus)
+def _add(out, args, ctx):
+    a, b = args
+    return _assign(out, f'({var(a)} + {var(b)}) & 0xffff')
+
+
+@template(abstract.sum_bit_bus)
+def _sum(out, args, ctx):
+    a, b = args
+    return _assign(out, f'({var(a)} + {var(b)}) & {(1 << width(a)) - 1:#x}')
+
+
+@template(abstract.sub_bit_bus)
+def _sub(out, args, ctx):
+    a, b = args
+    return _assign(out, f'({var(a)} - {var(b)}) & {(1 << width(a)) - 1:#x}')
+
+
+@template(abstract.alu_out_op)
+def _alu(out, args, ctx):
+    a, b, sel = (var(arg) for arg in args)
+    result = var(out)
+    return [
+        f'if {sel} == 0:',
+        f'    {result} = ({a} + {b}) & 0xffff',
+        f'elif {sel} == 1:',
+        f'    {result} = ({a} - {b}) & 0xffff',
+        f'elif {sel} == 2:',
+        f'    {result} = {a} & {b}',
+        f'elif {sel} == 3:',
+        f'    {result} = {a} | {b}',
+        f'elif {sel} == 4:',
+        f'    {result} = 1 if {a} < {b} else 0',
+        'else:',
+        '    raise AssertionError("ALU operation resulted in None")',
+    ]
+
+
+@template(abstract.and_gate)
+def _and(out, args, ctx):
+    a, b = args
+    return _assign(out, f'{var(a)} & {var(b)}')
+
+
+@template(abstract.mux_2to1, abstract.mux_4bit_2to1, abstract.mux_alu_src)
+def _mux(out, args, ctx):
+    sel, in0, in1 = args
+    return _assign(out, f'{var(in1)} if {var(sel)} else {var(in0)}')
+
+
+@template(abstract.extract_opcode)
+def _opcode(out, args, ctx):
+    return _assign(out, f'{var(args[0])} >> 12')
+
+
+@template(abstract.extract_rs)
+def _rs(out, args, ctx):
+    return _assign(out, f'({var(args[0])} >> 8) & 0xf')
+
+
+@template(abstract.extract_rt)
+def _rt(out, args, ctx):
+    return _assign(out, f'({var(args[0])} >> 4) & 0xf')
+
+
+@template(abstract.extract_rd)
+def _rd(out, args, ctx):
+    return _assign(out, f'{var(args[0])} & 0xf')
+
+
+@template(abstract.control_signal)
+def _control_signal(out, args, ctx):
+    rom, index, opcode = args
+    column = ctx.const(tuple(to_int(row[index].raw_value) for row in rom))
+    return _assign(out, f'{column}[{var(opcode)}]')
+
+
+@template(abstract.sign_extend_4to16)
+def _sign_extend(out, args, ctx):
+    value = var(args[0])
+    return _assign(out, f'{value} | 0xfff0 if {value} & 0x8 else {value}')
+
+
+@template(abstract.shift_left_1)
+def _shift_left(out, args, ctx):
+    return _assign(out, f'({var(args[0])} << 1) & {(1 << width(args[0])) - 1:#x}')
+
+
+@template(abstract.concat_jump_addr)
+def _jump_addr(out, args, ctx):
+    pc, instruction = args
+    return _assign(out, f'({var(pc)} & 0xf000) | (({var(instruction)} << 1) & 0x0fff)')
+
+
+@template(abstract.alu_zero)
+def _zero(out, args, ctx):
+    return _assign(out, f'{var(args[0])} == 0')
+
+
+@template(abstract.update_pc_reg)
+def _pc_reg(out, args, ctx):
+    pc, next_pc, _ = args
+    return _assign(out, var(next_pc) if ctx.rising else var(pc))
+
+
+@template(abstract.update_pc)
+def _pc_increment(out, args, ctx):
+    pc, _ = args
+    return _assign(out, f'({var(pc)} + 2) & 0xffff' if ctx.rising else var(pc))
+
+
+@template(abstract.read_reg_file)
+def _read_reg(out, args, ctx):
+    reg_file, addr = args
+    return _assign(out, f'{ctx.const(reg_file.data)}[{var(addr)}]')
+
+
+@template(abstract.update_reg_file)
+def _write_reg(out, args, ctx):
+    reg_file, idx, in_data, write_enable, _ = args
+    if not ctx.rising:
+        return _assign(out, 'False')
+
+    return [
+        f'if {var(write_enable)}:',
+        f'    {ctx.const(reg_file.data)}[{var(idx)}] = {var(in_data)}',
+        f'    {var(out)} = True',
+        'else:',
+        f'    {var(out)} = False',
+    ]
+
+
+def _word_addresses(memory: ByteMemory, addr: BaseBus) -> tuple[str, str]:
+    """Expressões dos endereços do byte alto e do baixo (com wrap-around no tamanho da memória)"""
+    if memory.size == 1 << width(addr):
+        return var(addr), f'({var(addr)} + 1) & {memory.size - 1:#x}'
+    return f'{var(addr)} % {memory.size}', f'({var(addr)} + 1) % {memory.size}'
+
+
+@template(abstract.read_mem)
+def _read_mem(out, args, ctx):
+    memory, addr = args
+    data = ctx.const(memory.data)
+    high, low = _word_addresses(memory, addr)
+    return _assign(out, f'({data}[{high}] << 8) | {data}[{low}]')
+
+
+@template(abstract.update_data_mem)
+def _write_mem(out, args, ctx):
+    memory, addr, write_data, write_enable, _ = args
+    if not ctx.rising:
+        return _assign(out, 'False')
+
+    if memory.trace:  # write_word cria as células que aparecem no VCD
+        store = [f'    {ctx.const(memory.write_word)}({var(addr)}, {var(write_data)})']
+    else:
+        data = ctx.const(memory.data)
+        high, low = _word_addresses(memory, addr)
+        store = [
+            f'    {data}[{high}] = {var(write_data)} >> 8',
+            f'    {data}[{low}] = {var(write_data)} & 0xff',
+        ]
+
+    return [
+        f'if {var(write_enable)}:',
+        *store,
+        f'    {var(out)} = True',
+        'else:',
+        f'    {var(out)} = False',
+    ]
+
+
+def source_hash(source: str) -> str:
+    """Chave do cache: hash do código gerado e da versão do bytecode do interpretador"""
+    return hashlib.sha256(f'{sys.implementation.cache_tag}\n{source}'.encode()).hexdigest()
+
+
+class CompiledNetlist:
+    """Netlist compilada de uma instância: executa ciclos completos sobre inteiros
+
+    Os valores dos barramentos são lidos no início de `run` e gravados de volta
+    no final. Com `sample`, a execução usa a variante com rastreamento, que grava
+    todos os barramentos e chama sample(ciclo, nível_do_clock) após cada fase.
+    """
+    def __init__(self, component: LevelizedComponent, clk: ClockBus, cache_dir: str | os.PathLike | None = None) -> None:
+        self.component = component
+        self.clk = clk
+        self.source, constants, self.variables = generate(component, clk)
+        self.key = source_hash(self.source)
+        self.buses = [component.buses[name[2:]] for name in self.variables]
+        code = _load_code(self.source, self.key, cache_dir)
+
+        namespace: dict = {}
+        exec(code, namespace)
+        self._run, self._run_traced = namespace['build'](*constants)
+
+    def run(self, cycles: int, sample: Callable[[int, bool], None] | None = None) -> None:
+        """Executa `cycles` ciclos completos de clock (fase baixa e fase alta)"""
+        values = [to_int(bus.value.raw_value) for bus in self.buses]
+        if sample is None:
+            values = self._run(cycles, values)
+        else:
+            values = self._run_traced(cycles, values, sample)
+
+        for bus, value in zip(self.buses, values):
+            bus.value = bit_value(value, width(bus))
+        self.clk.value = bit_value(0, 1)
+        self.clk.value = bit_value(1, 1)
+
+
+def _phase(component: LevelizedComponent, ctx: CompileContext, rising: bool) -> list[tuple[str, set[str], bool, list[str]]]:
+    """Código de uma fase de clock: (variável, variáveis lidas, tem efeito colateral, linhas)"""
+    ctx.rising = rising
+    statements = []
+    for level in component.levels:
+        for bus in level:
+            function = bus.assignment.assignment
+            generator = TEMPLATES.get(function.func)
+            if generator is None:
+                raise ValueError(f'No code template for helper "{function.func.__name__}" (bus "{bus.id}")')
+
+            lines = generator(bus, function.args, ctx)
+            if lines == [f'{var(bus)} = {var(bus)}']:
+                continue
+
+            reads = {var(dep) for dep in fan_in(bus) if not isinstance(dep, ClockBus)}
+            effect = rising and function.func in (abstract.update_reg_file, abstract.update_data_mem)
+            statements.append((var(bus), reads, effect, lines))
+
+    return statements
+
+
+def _live_statements(statements, live: set[str]) -> list:
+    """Remove as atribuições cujo valor não é lido antes de ser sobrescrito"""
+    kept = []
+    for statement in reversed(statements):
+        target, reads, effect, _ = statement
+        if effect or target in live:
+            kept.append(statement)
+            live.discard(target)
+            live |= reads
+
+    kept.reverse()
+    return kept
+
+
+def generate(component: LevelizedComponent, clk: ClockBus) -> tuple[str, list[object], list[str]]:
+    """Gera o fonte do módulo compilado
+
+    Retorna (fonte, constantes passadas para build(), variáveis na ordem de `values`).
+    """
+    if component.levels is None:
+        component.elaborate()
+
+    ctx = CompileContext()
+    low = _phase(component, ctx, rising=False)
+    high = _phase(component, ctx, rising=True)
+
+    variables = [var(bus) for level in component.levels for bus in level]
+    inputs = sorted({name for _, reads, _, _ in low + high for name in reads} - set(variables))
+    variables += inputs
+    buses = [component.buses[name[2:]] for name in variables]
+
+    # Sem rastreamento, a fase baixa só precisa calcular o que a fase alta lê antes de escrever
+    needed: set[str] = set()
+    assigned: set[str] = set()
+    for target, reads, _, _ in high:
+        needed |= reads - assigned
+        assigned.add(target)
+    low_live = _live_statements(low, needed)
+
+    bus_values = ctx.const([bus for bus in buses])
+    values = ctx.const(_VALUES)
+    clk_bus = ctx.const(clk)
+    clk_low = ctx.const(bit_value(0, 1))
+    clk_high = ctx.const(bit_value(1, 1))
+
+    def body(statements, indent: str) -> list[str]:
+        return [indent + line for _, _, _, lines in statements for line in lines]
+
+    def write_back(indent: str) -> list[str]:
+        return [
+            f'{indent}{bus_values}[{i}].value = {values}[{width(bus)}][{name}]'
+            for i, (name, bus) in enumerate(zip(variables, buses)) if name not in inputs
+        ]
+
+    state = ', '.join(variables)
+    source = [
+        f'# Gerado por compiler.py a partir da netlist {component.id_}',
+        f'def build({", ".join(f"k_{i}" for i in range(len(ctx.constants)))}):',
+        '    def run(cycles, values):',
+        f'        {state}, = values',
+        '        for _ in range(cycles):',
+        '            # Fase baixa (clk = 0)',
+        *body(low_live, ' ' * 12),
+        '            # Fase alta (clk = 1)',
+        *body(high, ' ' * 12),
+        f'        return [{state}]',
+        '',
+        '    def run_traced(cycles, values, sample):',
+        f'        {state}, = values',
+        '        for cycle in range(cycles):',
+        f'            {clk_bus}.value = {clk_low}',
+        *body(low, ' ' * 12),
+        *write_back(' ' * 12),
+        '            sample(cycle, False)',
+        f'            {clk_bus}.value = {clk_high}',
+        *body(high, ' ' * 12),
+        *write_back(' ' * 12),
+        '            sample(cycle, True)',
+        f'        return [{state}]',
+        '',
+        '    return run, run_traced',
+        '',
+    ]
+
+    return '\n'.join(source), ctx.constants, variables
+
+
+def _load_code(source: str, key: str, cache_dir: str | os.PathLike | None):
+    """Código objeto do módulo gerado, reaproveitado do cache em disco quando existir"""
+    cache_path = Path(cache_dir if cache_dir is not None else DEFAULT_CACHE_DIR) / f'{key}.code'
+    if cache_path.exists():
+        return marshal.loads(cache_path.read_bytes())
+
+    code = compile(source, f'<netlist {key[:12]}>', 'exec')
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    _write_atomic(cache_path.with_suffix('.py'), source.encode())  # Apenas para inspeção
+    _write_atomic(cache_path, marshal.dumps(code))
+    return code
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Grava em um arquivo temporário e renomeia (vários processos podem compartilhar o cache)"""
+    tmp_path = path.with_suffix(f'{path.suffix}.tmp{os.getpid()}')
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
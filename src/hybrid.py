@@ -0,0 +1,126 @@
+"""Execução híbrida: avanço rápido no simulador funcional e detalhe na netlist
+
+O IsaSimulator (isa.py) executa a maior parte do programa; na região de
+interesse o estado arquitetural (PC, registradores e memória de dados) é
+transferido para a netlist do mips16x, onde a simulação continua com todos os
+barramentos visíveis (e rastreáveis). O caminho inverso também é possível.
+
+Os dois modelos compartilham a temporização: `pc` é o endereço da última
+instrução executada. Na transferência para a netlist os barramentos
+combinacionais são reavaliados uma vez com o clock alto e sem borda, de modo
+que o próximo ciclo busca a instrução seguinte sem escrever nada.
+"""
+import argparse
+import os
+from collections.abc import Callable
+
+from codec import bit_value, to_int
+from isa import ArchState, IsaSimulator
+from mips16x import build_mips16x
+
+
+class HybridRunner:
+    """Alterna a execução de um programa entre o IsaSimulator e a netlist"""
+    def __init__(
+            self,
+            imem_size: int = 65536,
+            dmem_size: int = 65536,
+            initial_pc: int = 0xFFFE,
+            trace_memory: bool = True,
+            compiled: bool = False,
+    ) -> None:
+        self.isa = IsaSimulator(imem_size, dmem_size, initial_pc)
+        self.cpu = build_mips16x(imem_size, dmem_size, initial_pc, trace_memory)
+        if compiled:
+            self.cpu.compile()
+        self.mode = 'isa'
+        self.cycles = 0
+
+    def reset(self, clear_memory: bool = False) -> None:
+        self.isa.reset(clear_memory)
+        self.cpu.reset(clear_memory)
+        self.mode = 'isa'
+        self.cycles = 0
+
+    def load_program(self, image: bytes | str, base: int = 0) -> None:
+        """Carrega o programa nas memórias de instruções dos dois modelos"""
+        self.isa.load_program(image, base)
+        self.cpu.load_program(image, base)
+
+    def to_netlist(self) -> None:
+        """Transfere o estado do IsaSimulator para a netlist"""
+        if self.mode == 'netlist':
+            return
+
+        cpu = self.cpu
+        cpu.register_file.data[:] = self.isa.registers.data
+        cpu.memory.view[:] = self.isa.memory.data
+        cpu.pc.value = bit_value(self.isa.pc, 16)
+
+        # Clock alto sem borda: o pc se mantém e as portas de escrita ficam inativas
+        cpu.clk.value = bit_value(1, 1)
+        cpu.clk.rising = False
+        cpu.component.stabilize()
+        self.mode = 'netlist'
+
+    def to_isa(self) -> None:
+        """Transfere o estado da netlist para o IsaSimulator"""
+        if self.mode == 'isa':
+            return
+
+        cpu = self.cpu
+        self.isa.registers.data[:] = cpu.register_file.data
+        self.isa.memory.view[:] = cpu.memory.data
+        self.isa.pc = to_int(cpu.pc.value.raw_value)
+        self.mode = 'isa'
+
+    def fast_forward(self, cycles: int) -> None:
+        """Executa `cycles` instruções no simulador funcional"""
+        self.to_isa()
+        self.isa.run(cycles)
+        self.cycles += cycles
+
+    def detail(self, cycles: int, sample: Callable[[int], None] | None = None) -> None:
+        """Executa `cycles` ciclos na netlist, chamando sample(ciclo) após cada um"""
+        self.to_netlist()
+        if sample is None:
+            self.cpu.cycle(cycles)
+            self.cycles += cycles
+            return
+
+        for _ in range(cycles):
+            self.cpu.cycle()
+            sample(self.cycles)
+            self.cycles += 1
+
+    def state(self) -> ArchState:
+        return self.isa.state() if self.mode == 'isa' else self.cpu.state()
+
+
+if __name__ == '__main__':
+    from vcd import VcdWriter
+
+    parser = argparse.ArgumentParser(description='Fast-forward a mips16x program, then simulate the netlist in detail')
+    parser.add_argument('image', help='program image (.bin, .hex, .mem or .s)')
+    parser.add_argument('-s', '--skip', type=int, default=0, help='instructions executed at ISA level first')
+    parser.add_argument('-d', '--detail', type=int, default=100, help='cycles simulated on the netlist')
+    parser.add_argument('--vcd', help='VCD file for the detailed region')
+    parser.add_argument('--include', nargs='*', default=None, help='bus id patterns to trace')
+    parser.add_argument('--exclude', nargs='*', default=None, help='bus id patterns not to trace')
+    args = parser.parse_args()
+
+    runner = HybridRunner()
+    runner.load_program(args.image)
+    runner.fast_forward(args.skip)
+
+    if args.vcd:
+        runner.to_netlist()
+        with VcdWriter(os.fspath(args.vcd), runner.cpu.component, args.include, args.exclude) as writer:
+            runner.detail(args.detail, writer.sample)
+    else:
+        runner.detail(args.detail)
+
+    state = runner.state()
+    print(f'cycle {runner.cycles}: pc = 0x{state.pc:04X}')
+    for i, value in enumerate(state.registers):
+        print(f'reg[{i:2d}] = {value}')
@@ -0,0 +1,312 @@
+"""Simulador funcional (nível de instrução) do mips16x
+
+Modelo de referência rápido com a mesma semântica do datapath de mips16x.py:
+decodificação pela CONTROL_TABLE, ALU de alu_out_op, memória de 2 bytes por
+palavra (read_mem/update_data_mem) e endereços de desvio/salto de add_bus,
+shift_left_1 e concat_jump_addr. O estado fica em arrays planos de inteiros
+(RegisterFile e ByteMemory, os mesmos blocos usados pelo datapath).
+
+Temporização igual à do datapath: `pc` é o registrador de PC (0xFFFE no reset);
+a cada ciclo ele recebe o próximo PC e a instrução nesse endereço é executada.
+
+Blocos básicos (instruções em sequência até um BEQ ou JUMP) são traduzidos uma
+única vez para funções Python, indexadas pelo PC inicial: os laços executam sem
+decodificar nada. O datapath nunca escreve na memória de instruções, então o
+cache só é descartado quando ela muda por fora (load_program, load/clear da
+ByteMemory, loader.load_words...), detectado pela `generation` da memória.
+"""
+from collections.abc import Callable
+from typing import NamedTuple
+
+from abstract import CONTROL_TABLE, ControlWord, NOP
+from loader import load_image
+from storage import ByteMemory, RegisterFile
+
+
+class ArchState(NamedTuple):
+    """Estado arquitetural: PC, 16 registradores e conteúdo da memória de dados"""
+    pc: int
+    registers: tuple[int, ...]
+    memory: bytes
+
+
+# Palavra decodificada: (rs, rt, rd_dest, usa_imediato, imediato, alu_op, mem_to_reg, reg_write, mem_write, branch, jump)
+Decoded = tuple[int, int, int, bool, int, int, bool, bool, bool, bool, bool]
+
+
+def decode(word: int, table: dict[int, ControlWord] = CONTROL_TABLE) -> Decoded:
+    """Decodifica uma instrução de 16 bits nos campos e sinais de controle usados pelo datapath"""
+    control = table.get((word >> 12) & 0xF, NOP)
+    rs, rt, rd = (word >> 8) & 0xF, (word >> 4) & 0xF, word & 0xF
+    immediate = rd | 0xFFF0 if rd & 0x8 else rd  # sign_extend_4to16
+
+    return (
+        rs,
+        rt,
+        rd if control.reg_dst else rt,
+        bool(control.alu_src),
+        immediate,
+        control.alu_op,
+        bool(control.mem_to_reg),
+        bool(control.rf_write_enable),
+        bool(control.mem_write_enable),
+        bool(control.branch),
+        bool(control.jump),
+    )
+
+
+# Instruções por bloco traduzido (blocos maiores são divididos)
+MAX_BLOCK = 64
+
+# Bloco traduzido: (função(regs, mem) -> próximo PC, nº de instruções, PC da última instrução)
+Block = tuple[Callable[[object, bytearray], int], int, int]
+
+_ALU_EXPRESSIONS = {
+    0b000: '({a} + {b}) & 0xFFFF',
+    0b001: '({a} - {b}) & 0xFFFF',
+    0b010: '{a} & {b}',
+    0b011: '{a} | {b}',
+    0b100: '1 if {a} < {b} else 0',
+}
+
+
+def translate_block(fetch: Callable[[int], int], decode_word: Callable[[int], Decoded], start: int, mem_size: int) -> Block | None:
+    """Traduz o bloco básico que começa em `start` para uma função Python
+
+    O código gerado tem a mesma semântica do laço de IsaSimulator.run, com os
+    campos e o imediato já resolvidos como constantes. Retorna None se a
+    primeira instrução não puder ser traduzida (operação de ALU inválida).
+    """
+    lines = ['def block(r, m):']
+    pc = start
+    last = start
+    count = 0
+    next_pc = None
+    while count < MAX_BLOCK:
+        word = fetch(pc)
+        rs, rt, dest, use_imm, imm, alu_op, mem_to_reg, reg_write, mem_write, branch, jump = decode_word(word)
+        if alu_op not in _ALU_EXPRESSIONS:
+            break  # Fica para o interpretador, que gera o mesmo erro
+
+        last = pc
+        count += 1
+        result = _ALU_EXPRESSIONS[alu_op].format(a=f'r[{rs}]', b=imm if use_imm else f'r[{rt}]')
+        if mem_write or (reg_write and mem_to_reg) or (branch and not jump):
+            lines.append(f'    x = {result}')
+            result = 'x'
+        if mem_write or (reg_write and mem_to_reg):
+            lines.append(f'    a = x % {mem_size}')
+        if mem_write:
+            lines.append(f'    d = r[{rt}]')
+            lines.append(f'    m[a] = d >> 8')
+            lines.append(f'    m[(a + 1) % {mem_size}] = d & 0xFF')
+        if reg_write:
+            if mem_to_reg:
+                lines.append(f'    r[{dest}] = (m[a] << 8) | m[(a + 1) % {mem_size}]')
+            else:
+                lines.append(f'    r[{dest}] = {result}')
+
+        if jump:
+            next_pc = (pc & 0xF000) | ((word << 1) & 0x0FFF)
+            break
+        if branch:
+            lines.append(f'    if x == 0:')
+            lines.append(f'        return {(pc + 2 + (imm << 1)) & 0xFFFF}')
+            next_pc = (pc + 2) & 0xFFFF
+            break
+
+        pc = (pc + 2) & 0xFFFF
+        next_pc = pc
+
+    if count == 0:
+        return None
+
+    lines.append(f'    return {next_pc}')
+    namespace: dict = {}
+    exec(compile('\n'.join(lines), f'<block 0x{start:04X}>', 'exec'), namespace)
+    return namespace['block'], count, last
+
+
+class IsaSimulator:
+    """Interpretador do conjunto de instruções do mips16x"""
+    def __init__(
+            self,
+            imem_size: int = 65536,
+            dmem_size: int = 65536,
+            initial_pc: int = 0xFFFE,
+            table: dict[int, ControlWord] = CONTROL_TABLE,
+            translate: bool = True,
+    ) -> None:
+        self.initial_pc = initial_pc
+        self.table = table
+        self.translate = translate
+        self.instruction_memory = ByteMemory(imem_size, 'imem')
+        self.memory = ByteMemory(dmem_size, 'mem')
+        self.registers = RegisterFile(16)
+        # Cache de decodificação por palavra (o espaço de instruções tem só 65536 palavras)
+        self._decoded: dict[int, Decoded] = {}
+        # Blocos básicos traduzidos, pelo PC inicial (None: bloco não traduzível), válidos
+        # enquanto a geração da memória de instruções não mudar
+        self._blocks: dict[int, Block | None] = {}
+        self._generation = self.instruction_memory.generation
+        self.reset()
+
+    def reset(self, clear_memory: bool = False) -> None:
+        """Volta ao estado de reset (PC inicial e registradores zerados)"""
+        self.pc = self.initial_pc
+        self.cycles = 0
+        self.registers.clear()
+        if clear_memory:
+            self.memory.clear()
+            self.instruction_memory.clear()
+
+    def load_program(self, image: bytes | str, base: int = 0) -> None:
+        """Carrega uma imagem (bytes ou caminho de arquivo aceito pelo loader) na memória de instruções"""
+        if isinstance(image, str):
+            load_image(self.instruction_memory, image, base=base)
+        else:
+            self.instruction_memory.load(image, base)
+
+    def fetch(self, pc: int) -> int:
+        return self.instruction_memory.read_word(pc)
+
+    def next_pc(self) -> int:
+        """Próximo PC calculado pela instrução atual (o que o datapath mostra em `next_pc`)"""
+        return self._successor(self.pc, self.fetch(self.pc))
+
+    def _successor(self, pc: int, word: int) -> int:
+        rs, rt, _, use_imm, imm, alu_op, _, _, _, branch, jump = self._decode(word)
+        if jump:
+            return (pc & 0xF000) | ((word << 1) & 0x0FFF)
+        if branch and _alu(alu_op, self.registers.data[rs], imm if use_imm else self.registers.data[rt]) == 0:
+            return (pc + 2 + (imm << 1)) & 0xFFFF
+        return (pc + 2) & 0xFFFF
+
+    def _decode(self, word: int) -> Decoded:
+        decoded = self._decoded.get(word)
+        if decoded is None:
+            decoded = self._decoded[word] = decode(word, self.table)
+        return decoded
+
+    def step(self) -> None:
+        """Executa um ciclo (uma instrução)"""
+        self.run(1)
+
+    def run(self, max_cycles: int) -> int:
+        """Executa até `max_cycles` ciclos e retorna quantos foram executados
+
+        Com `translate`, executa bloco a bloco pelo cache de traduções; o que
+        sobra do orçamento quando o próximo bloco não cabe mais é interpretado.
+        """
+        if not self.translate:
+            return self._interpret(max_cycles)
+
+        if self._generation != self.instruction_memory.generation:  # Programa novo ou alterado
+            self._blocks.clear()
+            self._generation = self.instruction_memory.generation
+
+        regs = self.registers.data
+        mem = self.memory.data
+        blocks = self._blocks
+
+        pc = self.pc
+        next_pc = self.next_pc()
+        remaining = max_cycles
+        while remaining:
+            try:
+                block = blocks[next_pc]
+            except KeyError:
+                block = blocks[next_pc] = translate_block(self.fetch, self._decode, next_pc, len(mem))
+            if block is None or block[1] > remaining:
+                break
+
+            function, length, pc = block
+            next_pc = function(regs, mem)
+            remaining -= length
+
+        self.pc = pc
+        self.cycles += max_cycles - remaining
+        if remaining:
+            self._interpret(remaining)
+        return max_cycles
+
+    def _interpret(self, max_cycles: int) -> int:
+        """Executa `max_cycles` ciclos instrução a instrução"""
+        regs = self.registers.data
+        imem = self.instruction_memory.data
+        imem_size = len(imem)
+        mem = self.memory.data
+        mem_size = len(mem)
+        decoded = self._decoded
+        table = self.table
+
+        pc = self.pc
+        next_pc = self.next_pc()
+
+        for _ in range(max_cycles):
+            pc = next_pc
+            word = (imem[pc % imem_size] << 8) | imem[(pc + 1) % imem_size]
+
+            d = decoded.get(word)
+            if d is None:
+                d = decoded[word] = decode(word, table)
+            rs, rt, dest, use_imm, imm, alu_op, mem_to_reg, reg_write, mem_write, branch, jump = d
+
+            a = regs[rs]
+            b = imm if use_imm else regs[rt]
+            if alu_op == 0:
+                result = (a + b) & 0xFFFF
+            elif alu_op == 1:
+                result = (a - b) & 0xFFFF
+            elif alu_op == 2:
+                result = a & b
+            elif alu_op == 3:
+                result = a | b
+            elif alu_op == 4:
+                result = 1 if a < b else 0
+            else:
+                raise AssertionError("ALU operation resulted in None")
+
+            if mem_write:
+                addr = result % mem_size
+                data = regs[rt]
+                mem[addr] = data >> 8
+                mem[(addr + 1) % mem_size] = data & 0xFF
+
+            if reg_write:
+                if mem_to_reg:
+                    addr = result % mem_size
+                    regs[dest] = (mem[addr] << 8) | mem[(addr + 1) % mem_size]
+                else:
+                    regs[dest] = result
+
+            if jump:
+                next_pc = (pc & 0xF000) | ((word << 1) & 0x0FFF)
+            elif branch and result == 0:
+                next_pc = (pc + 2 + (imm << 1)) & 0xFFFF
+            else:
+                next_pc = (pc + 2) & 0xFFFF
+
+        self.pc = pc
+        self.cycles += max_cycles
+        return max_cycles
+
+    def state(self) -> ArchState:
+        return ArchState(self.pc, tuple(self.registers.data), bytes(self.memory.data))
+
+
+def _alu(alu_op: int, a: int, b: int) -> int:
+    """ALU com a mesma semântica de abstract.alu_out_op, sobre inteiros de 16 bits"""
+    match alu_op:
+        case 0b000:
+            return (a + b) & 0xFFFF
+        case 0b001:
+            return (a - b) & 0xFFFF
+        case 0b010:
+            return a & b
+        case 0b011:
+            return a | b
+        case 0b100:
+            return 1 if a < b else 0
+
+    raise AssertionError("ALU operation resulted in None")
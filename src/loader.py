@@ -0,0 +1,165 @@
+import mmap
+import os
+from collections.abc import Iterable
+
+from storage import ByteMemory
+
+# Extensões reconhecidas quando o formato não é informado
+FORMATS_BY_EXTENSION = {
+    '.bin': 'bin',
+    '.img': 'bin',
+    '.hex': 'ihex',
+    '.ihex': 'ihex',
+    '.mem': 'memh',
+    '.memh': 'memh',
+    '.s': 'asm',
+    '.asm': 'asm',
+}
+
+
+def detect_format(path: str) -> str:
+    """Descobre o formato da imagem pela extensão do arquivo (binário bruto por padrão)"""
+    _, ext = os.path.splitext(path)
+    return FORMATS_BY_EXTENSION.get(ext.lower(), 'bin')
+
+
+def _map_file(path: str) -> mmap.mmap | None:
+    """Mapeia o arquivo em memória somente leitura (None se estiver vazio)"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def parse_ihex(lines: Iterable[bytes]) -> list[tuple[int, bytes]]:
+    """Lê registros Intel-HEX e retorna os segmentos (endereço, dados)"""
+    segments: list[tuple[int, bytes]] = []
+    base = 0
+
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        if not line.startswith(b':'):
+            raise ValueError(f'Intel-HEX line {line_number}: record must start with ":"')
+
+        try:
+            record = bytes.fromhex(line[1:].decode('ascii'))
+        except ValueError:
+            raise ValueError(f'Intel-HEX line {line_number}: invalid hex digits') from None
+
+        if len(record) < 5 or len(record) != record[0] + 5:
+            raise ValueError(f'Intel-HEX line {line_number}: invalid record length')
+        if sum(record) & 0xFF:
+            raise ValueError(f'Intel-HEX line {line_number}: checksum mismatch')
+
+        count, address, record_type = record[0], (record[1] << 8) | record[2], record[3]
+        data = record[4:4 + count]
+
+        match record_type:
+            case 0x00:  # Dados
+                segments.append((base + address, data))
+            case 0x01:  # Fim de arquivo
+                break
+            case 0x02:  # Endereço de segmento estendido
+                base = int.from_bytes(data, 'big') << 4
+            case 0x04:  # Endereço linear estendido
+                base = int.from_bytes(data, 'big') << 16
+            case 0x03 | 0x05:  # Endereço de início (ignorado)
+                pass
+            case _:
+                raise ValueError(f'Intel-HEX line {line_number}: unknown record type {record_type:02X}')
+
+    return segments
+
+
+def parse_memh(lines: Iterable[bytes], word_bytes: int = 2) -> list[tuple[int, bytes]]:
+    """Lê uma imagem no estilo $readmemh (uma palavra por token, `@addr` em palavras)"""
+    segments: list[tuple[int, bytes]] = []
+    address = 0
+    current_start = 0
+    current = bytearray()
+
+    for line_number, line in enumerate(lines, start=1):
+        line = line.split(b'//', 1)[0]
+        for token in line.split():
+            token = token.replace(b'_', b'')
+            try:
+                if token.startswith(b'@'):
+                    if current:
+                        segments.append((current_start, bytes(current)))
+                        current = bytearray()
+                    address = int(token[1:], 16) * word_bytes
+                    current_start = address
+                    continue
+
+                word = int(token, 16)
+            except ValueError:
+                raise ValueError(f'memh line {line_number}: invalid token "{token.decode(errors="replace")}"') from None
+
+            if word >> (8 * word_bytes):
+                raise ValueError(f'memh line {line_number}: word "{token.decode()}" wider than {word_bytes} bytes')
+
+            current += word.to_bytes(word_bytes, 'big')
+            address += word_bytes
+
+    if current:
+        segments.append((current_start, bytes(current)))
+
+    return segments
+
+
+def read_image(path: str, fmt: str | None = None) -> list[tuple[int, bytes]]:
+    """Lê uma imagem de programa e retorna seus segmentos (endereço, dados)
+
+    Formatos: 'bin' (binário bruto), 'ihex' (Intel-HEX), 'memh' (estilo $readmemh)
+    e 'asm' (fonte montado pelo assembler).
+    """
+    fmt = fmt or detect_format(path)
+    mapped = _map_file(path)
+    if mapped is None:
+        return []
+
+    with mapped:
+        match fmt:
+            case 'bin':
+                return [(0, bytes(mapped))]
+            case 'ihex':
+                return parse_ihex(iter(mapped.readline, b''))
+            case 'memh':
+                return parse_memh(iter(mapped.readline, b''))
+            case 'asm':
+                from assembler import assemble
+                return [(0, assemble(mapped[:].decode()))]
+            case _:
+                raise ValueError(f'Unknown image format "{fmt}"')
+
+
+def load_image(memory: ByteMemory, path: str, fmt: str | None = None, base: int = 0) -> int:
+    """Carrega o arquivo de imagem na memória a partir de `base` e retorna o número de bytes
+
+    Imagens binárias são copiadas diretamente do mapeamento (mmap) para a memória.
+    """
+    fmt = fmt or detect_format(path)
+
+    if fmt == 'bin':
+        mapped = _map_file(path)
+        if mapped is None:
+            return 0
+        with mapped:
+            memory.load(mapped, base)
+            return len(mapped)
+
+    loaded = 0
+    for address, data in read_image(path, fmt):
+        memory.load(data, base + address)
+        loaded += len(data)
+
+    return loaded
+
+
+def load_words(memory: ByteMemory, words: Iterable[int], base: int = 0) -> int:
+    """Carrega uma sequência de instruções de 16 bits a partir de `base`"""
+    image = b''.join((word & 0xFFFF).to_bytes(2, 'big') for word in words)
+    memory.load(image, base)
+    return len(image)
@@ -1,445 +1,667 @@
+import os
+import struct
+import zlib
+from array import array
+from collections.abc import Callable, Iterable
 from functools import partial
+from typing import NamedTuple
 
-from flote.backend.python.core.buses import BitBus, BitBusValue
+from flote.backend.python.core.buses import BitBus
 from flote.backend.python.core.component import Component
 
 from abstract import (
-    AbsAssignment, alu_out_op, update_reg, update_mem, read_mem, mux_2to1,
+    AbsAssignment, ClockBus, alu_out_op, update_reg_file, read_reg_file, update_data_mem, read_mem, mux_2to1,
     extract_opcode, extract_rs, extract_rt, extract_rd, mux_4bit_2to1,
     sign_extend_4to16, mux_alu_src, shift_left_1, add_bus, concat_jump_addr, alu_zero,
-    control_unit, update_pc_reg
+    update_pc_reg, build_control_rom, control_signal, CONTROL_SIGNALS, buffer, and_gate
 )
-
-# Declarations of buses
-
-#* Clock
-clk = BitBus()
-clk.id = "clk"
-clk.value = BitBusValue([False])
-
-#* Program Counter (PC)
-pc = BitBus()
-pc.id = "pc"
-# Inicializa PC em -2 (0xFFFE) para que o primeiro incremento resulte em 0
-pc.value = BitBusValue([True] * 15 + [False])  # 1111111111111110 = -2 em complemento de 2
-
-# PC + 2 (próxima instrução sequencial)
-pc_plus_2 = BitBus()
-pc_plus_2.id = "pc_plus_2"
-pc_plus_2.value = BitBusValue([False] * 16)
-
-# Constante 2 para somar ao PC
-const_2 = BitBus()
-const_2.id = "const_2"
-const_2.value = BitBusValue([False] * 15 + [False, True, False])  # 2 em binário
-
-# Branch offset deslocado
-branch_offset = BitBus()
-branch_offset.id = "branch_offset"
-branch_offset.value = BitBusValue([False] * 16)
-
-# Endereço de branch (PC + 2 + offset << 1)
-branch_addr = BitBus()
-branch_addr.id = "branch_addr"
-branch_addr.value = BitBusValue([False] * 16)
-
-# Sinal zero da ALU
-zero = BitBus()
-zero.id = "zero"
-zero.value = BitBusValue([False])
-
-# Sinais de controle
-branch = BitBus()
-branch.id = "branch"
-branch.value = BitBusValue([False])
-
-jump = BitBus()
-jump.id = "jump"
-jump.value = BitBusValue([False])
-
-# Multiplexadores para o próximo PC
-pc_src = BitBus()  # Branch and zero
-pc_src.id = "pc_src"
-pc_src.value = BitBusValue([False])
-
-branch_or_seq = BitBus()  # Saída do mux branch
-branch_or_seq.id = "branch_or_seq"
-branch_or_seq.value = BitBusValue([False] * 16)
-
-jump_addr = BitBus()  # Endereço de jump
-jump_addr.id = "jump_addr"
-jump_addr.value = BitBusValue([False] * 16)
-
-next_pc = BitBus()  # Próximo valor do PC
-next_pc.id = "next_pc"
-next_pc.value = BitBusValue([False] * 16)
-
-#* Instruction Memory (32 bytes de 8 bits cada)
-# Cada instrução de 16 bits ocupa 2 bytes consecutivos
-# Formato da instrução: [opcode(4) | rs(4) | rt(4) | rd(4)]
-instruction_memory_data = [BitBusValue([False] * 8) for _ in range(32)]  # 32 bytes
-instruction_memory = [BitBus() for _ in range(32)]
-for i, mem in enumerate(instruction_memory):
-    mem.id = f"imem_{i}"
-    mem.value = instruction_memory_data[i]
-
-# Instrução atual
-instruction = BitBus()
-instruction.id = "instruction"
-instruction.value = BitBusValue([False] * 16)
-
-# Campos da instrução
-opcode = BitBus()
-opcode.id = "opcode"
-opcode.value = BitBusValue([False] * 4)
-
-rs = BitBus()
-rs.id = "rs"
-rs.value = BitBusValue([False] * 4)
-
-rt = BitBus()
-rt.id = "rt"
-rt.value = BitBusValue([False] * 4)
-
-rd = BitBus()
-rd.id = "rd"
-rd.value = BitBusValue([False] * 4)
-
-# Multiplexador para selecionar entre rt e rd (reg_dst)
-reg_dst = BitBus()
-reg_dst.id = "reg_dst"
-reg_dst.value = BitBusValue([False])
-
-write_reg = BitBus()
-write_reg.id = "write_reg"
-write_reg.value = BitBusValue([False] * 4)
-
-# Extensor de sinal (rd de 4 bits para 16 bits)
-immediate = BitBus()
-immediate.id = "immediate"
-immediate.value = BitBusValue([False] * 16)
-
-# Sinal de controle ALUSrc
-alu_src = BitBus()
-alu_src.id = "alu_src"
-alu_src.value = BitBusValue([False])
-
-#* ALU
-alu_a = BitBus()
-alu_a.id = "alu_a"
-alu_a.value = BitBusValue([False] * 16)
-alu_b = BitBus()
-alu_b.id = "alu_b"
-alu_b.value = BitBusValue([False] * 16)
-alu_b_mux = BitBus()
-alu_b_mux.id = "alu_b_mux"
-alu_b_mux.value = BitBusValue([False] * 16)
-alu_op = BitBus()
-alu_op.id = "alu_op"
-alu_op.value = BitBusValue([False] * 3)
-alu_out = BitBus()
-alu_out.id = "alu_out"
-alu_out.value = BitBusValue([False] * 16)
-
-#* Register Bank
-registers_data = [
-    BitBusValue([False] * 16),
-    BitBusValue([False] * 16),
-    BitBusValue([False] * 16),
-    BitBusValue([False] * 16),
-    BitBusValue([False] * 16),
-    BitBusValue([False] * 16),
-    BitBusValue([False] * 16),
-    BitBusValue([False] * 16),
-    BitBusValue([False] * 16),
-    BitBusValue([False] * 16),
-    BitBusValue([False] * 16),
-    BitBusValue([False] * 16),
-    BitBusValue([False] * 16),
-    BitBusValue([False] * 16),
-    BitBusValue([False] * 16),
-    BitBusValue([False] * 16),
-]
-registers = [BitBus() for _ in range(16)]
-for i, reg in enumerate(registers):
-    reg.id = f"reg_{i}"
-    reg.value = registers_data[i]
-
-rf_write_enable = BitBus()
-rf_write_enable.id = "rf_write_enable"
-rf_write_enable.value = BitBusValue([False])
-
-rf_read_addr1 = BitBus()
-rf_read_addr1.id = "rf_read_addr1"
-rf_read_addr1.value = BitBusValue([False] * 4)
-rf_read_data1 = BitBus()
-rf_read_data1.id = "rf_read_data1"
-rf_read_data1.value = BitBusValue([False] * 16)
-
-rf_read_addr2 = BitBus()
-rf_read_addr2.id = "rf_read_addr2"
-rf_read_addr2.value = BitBusValue([False] * 4)
-rf_read_data2 = BitBus()
-rf_read_data2.id = "rf_read_data2"
-rf_read_data2.value = BitBusValue([False] * 16)
-
-rf_write_addr = BitBus()
-rf_write_addr.id = "rf_write_addr"
-rf_write_addr.value = BitBusValue([False] * 4)
-rf_write_data = BitBus()
-rf_write_data.id = "rf_write_data"
-rf_write_data.value = BitBusValue([False] * 16)
-
-#* Data Memory (32 bytes de 8 bits cada)
-memory_data = [BitBusValue([False] * 8) for _ in range(32)]  # 32 bytes
-memory = [BitBus() for _ in range(32)]
-for i, mem in enumerate(memory):
-    mem.id = f"mem_{i}"
-    mem.value = memory_data[i]
-
-mem_addr = BitBus()
-mem_addr.id = "mem_addr"
-mem_addr.value = BitBusValue([False] * 16)
-mem_write_data = BitBus()
-mem_write_data.id = "mem_write_data"
-mem_write_data.value = BitBusValue([False] * 16)
-mem_read_data = BitBus()
-mem_read_data.id = "mem_read_data"
-mem_read_data.value = BitBusValue([False] * 16)
-mem_write_enable = BitBus()
-mem_write_enable.id = "mem_write_enable"
-mem_write_enable.value = BitBusValue([False])
-
-#* Multiplexador (seleciona entre alu_out e mem_read_data)
-mem_to_reg = BitBus()
-mem_to_reg.id = "mem_to_reg"
-mem_to_reg.value = BitBusValue([False])
-mux_out = BitBus()
-mux_out.id = "mux_out"
-mux_out.value = BitBusValue([False] * 16)
-
-buses = [
-    clk,
-    pc,
-    pc_plus_2,
-    const_2,
-    branch_offset,
-    branch_addr,
-    zero,
-    branch,
-    jump,
-    pc_src,
-    branch_or_seq,
-    jump_addr,
-    next_pc,
-    instruction,
-    opcode,
-    rs,
-    rt,
-    rd,
-    reg_dst,
-    write_reg,
-    immediate,
-    alu_src,
-    alu_a,
-    alu_b,
-    alu_b_mux,
-    alu_op,
-    alu_out,
-    rf_write_enable,
-    rf_read_addr1,
-    rf_read_data1,
-    rf_read_addr2,
-    rf_read_data2,
-    rf_write_addr,
-    rf_write_data,
-    mem_addr,
-    mem_write_data,
-    mem_read_data,
-    mem_write_enable,
-    mem_to_reg,
-    mux_out,
-] + registers + memory + instruction_memory
-
-# Elaboration of the component
-#. Clock
-clk.influence_list = [pc] + [bus for bus in registers]
-
-#. Program Counter (PC) - agora recebe next_pc ao invés de incrementar internamente
-pc.assignment = AbsAssignment(partial(update_pc_reg, pc, next_pc, clk))
-# PC deve ser influenciado pelos registradores para garantir que eles escrevam primeiro
-pc.influence_list = [instruction, pc_plus_2] + [bus for bus in registers]
-
-#. Lógica de Branch e Jump
-# PC + 2 (próxima instrução sequencial)
-pc_plus_2.assignment = AbsAssignment(partial(add_bus, pc, const_2))
-pc_plus_2.influence_list = [branch_addr, branch_or_seq]
-
-# Branch offset = immediate << 1
-branch_offset.assignment = AbsAssignment(partial(shift_left_1, immediate))
-branch_offset.influence_list = [branch_addr]
-
-# Branch address = PC + 2 + (offset << 1)
-branch_addr.assignment = AbsAssignment(partial(add_bus, pc_plus_2, branch_offset))
-branch_addr.influence_list = [branch_or_seq]
-
-# Sinal zero da ALU
-zero.assignment = AbsAssignment(partial(alu_zero, alu_out))
-zero.influence_list = [pc_src]
-
-# PC_src = Branch AND Zero
-branch.influence_list = [pc_src]
-pc_src.assignment = AbsAssignment(lambda: BitBusValue([branch.value.raw_value[0] and zero.value.raw_value[0]]))
-pc_src.influence_list = [branch_or_seq]
-
-# Multiplexador Branch: seleciona entre PC+2 ou branch_addr
-branch_or_seq.assignment = AbsAssignment(partial(mux_2to1, pc_src, pc_plus_2, branch_addr))
-branch_or_seq.influence_list = [next_pc]
-
-# Jump address = PC[15:12] | (instr[11:0] << 1)
-# Extrai os 12 bits inferiores da instrução (rd + rt + rs = 12 bits)
-jump_addr.assignment = AbsAssignment(partial(concat_jump_addr, pc, instruction))
-jump_addr.influence_list = [next_pc]
-
-# Multiplexador Jump: seleciona entre branch_or_seq ou jump_addr
-jump.influence_list = [next_pc]
-next_pc.assignment = AbsAssignment(partial(mux_2to1, jump, branch_or_seq, jump_addr))
-next_pc.influence_list = []  # Removido PC para evitar loop circular
-
-#. Instruction Memory (leitura assíncrona)
-instruction.assignment = AbsAssignment(partial(read_mem, instruction_memory, pc))
-instruction.influence_list = [opcode, rs, rt, rd]
-
-#. Decodificação da Instrução
-opcode.assignment = AbsAssignment(partial(extract_opcode, instruction))
-opcode.influence_list = [reg_dst, alu_src, mem_to_reg, rf_write_enable, mem_write_enable, branch, alu_op, jump]
-
-#. Unidade de Controle
-# Função auxiliar para extrair cada sinal da tupla retornada pela control_unit
-def get_reg_dst(opcode: BitBus) -> BitBusValue:
-    return control_unit(opcode)[0]
-
-def get_alu_src(opcode: BitBus) -> BitBusValue:
-    return control_unit(opcode)[1]
-
-def get_mem_to_reg(opcode: BitBus) -> BitBusValue:
-    return control_unit(opcode)[2]
-
-def get_rf_write_enable(opcode: BitBus) -> BitBusValue:
-    return control_unit(opcode)[3]
-
-def get_mem_write_enable(opcode: BitBus) -> BitBusValue:
-    return control_unit(opcode)[4]
-
-def get_branch(opcode: BitBus) -> BitBusValue:
-    return control_unit(opcode)[5]
-
-def get_alu_op(opcode: BitBus) -> BitBusValue:
-    return control_unit(opcode)[6]
-
-def get_jump(opcode: BitBus) -> BitBusValue:
-    return control_unit(opcode)[7]
-
-# Atribuir os sinais de controle baseado no opcode
-reg_dst.assignment = AbsAssignment(partial(get_reg_dst, opcode))
-alu_src.assignment = AbsAssignment(partial(get_alu_src, opcode))
-mem_to_reg.assignment = AbsAssignment(partial(get_mem_to_reg, opcode))
-rf_write_enable.assignment = AbsAssignment(partial(get_rf_write_enable, opcode))
-mem_write_enable.assignment = AbsAssignment(partial(get_mem_write_enable, opcode))
-branch.assignment = AbsAssignment(partial(get_branch, opcode))
-alu_op.assignment = AbsAssignment(partial(get_alu_op, opcode))
-jump.assignment = AbsAssignment(partial(get_jump, opcode))
-
-rs.assignment = AbsAssignment(partial(extract_rs, instruction))
-rs.influence_list = [rf_read_addr1]
-
-rt.assignment = AbsAssignment(partial(extract_rt, instruction))
-rt.influence_list = [rf_read_addr2, write_reg]
-
-rd.assignment = AbsAssignment(partial(extract_rd, instruction))
-rd.influence_list = [write_reg, immediate]
-
-#. Multiplexador reg_dst (seleciona entre rt e rd para o endereço de escrita)
-reg_dst.influence_list = [write_reg]
-write_reg.assignment = AbsAssignment(partial(mux_4bit_2to1, reg_dst, rt, rd))
-write_reg.influence_list = [rf_write_addr]
-
-#. Extensor de sinal (rd de 4 bits para 16 bits para instruções tipo I)
-immediate.assignment = AbsAssignment(partial(sign_extend_4to16, rd))
-immediate.influence_list = [alu_b_mux]
-
-#. ALU
-alu_a.assignment = AbsAssignment(lambda: BitBusValue(rf_read_data1.value.raw_value))
-alu_a.influence_list = [alu_out]
-
-# Multiplexador ALUSrc na entrada B da ALU
-alu_b.assignment = AbsAssignment(lambda: BitBusValue(rf_read_data2.value.raw_value))
-alu_b.influence_list = [alu_b_mux]
-
-alu_src.influence_list = [alu_b_mux]
-alu_b_mux.assignment = AbsAssignment(partial(mux_alu_src, alu_src, alu_b, immediate))
-alu_b_mux.influence_list = [alu_out]
-
-alu_out.influence_list = [rf_write_data]
-alu_out.assignment = AbsAssignment(partial(alu_out_op, alu_a, alu_b_mux, alu_op))
-
-#. Register Bank
-rf_write_enable.influence_list = [bus for bus in registers]
-
-for i, reg in enumerate(registers):
-    reg.assignment = AbsAssignment(partial(update_reg, reg, i, rf_write_addr, rf_write_data, rf_write_enable, clk))
-
-# Conectar rs a rf_read_addr1
-rf_read_addr1.assignment = AbsAssignment(lambda: BitBusValue(rs.value.raw_value))
-rf_read_addr1.influence_list = [rf_read_data1]
-rf_read_data1.assignment = AbsAssignment(
-    lambda: BitBusValue(registers[int('0b' + ''.join(['1' if bit else '0' for bit in rf_read_addr1.value.raw_value]), 2)].value.raw_value)
-)
-rf_read_data1.influence_list = [alu_a]
-
-# Conectar rt a rf_read_addr2
-rf_read_addr2.assignment = AbsAssignment(lambda: BitBusValue(rt.value.raw_value))
-rf_read_addr2.influence_list = [rf_read_data2]
-rf_read_data2.assignment = AbsAssignment(
-    lambda: BitBusValue(registers[int('0b' + ''.join(['1' if bit else '0' for bit in rf_read_addr2.value.raw_value]), 2)].value.raw_value)
-)
-rf_read_data2.influence_list = [alu_b, mem_write_data]
-
-# Conectar write_reg a rf_write_addr
-rf_write_addr.assignment = AbsAssignment(lambda: BitBusValue(write_reg.value.raw_value))
-rf_write_addr.influence_list = [bus for bus in registers]
-rf_write_data.influence_list = [bus for bus in registers]
-rf_write_data.assignment = AbsAssignment(lambda: BitBusValue(mux_out.value.raw_value))
-
-#. Data Memory
-# A saída da ALU entra como endereço da memória
-mem_addr.assignment = AbsAssignment(lambda: BitBusValue(alu_out.value.raw_value))
-mem_addr.influence_list = [mem_read_data] + memory
-
-# O dado a ser escrito na memória vem do segundo registrador lido
-mem_write_data.assignment = AbsAssignment(lambda: BitBusValue(rf_read_data2.value.raw_value))
-mem_write_data.influence_list = memory
-
-# Configuração das células de memória
-mem_write_enable.influence_list = memory
-clk.influence_list = clk.influence_list + memory
-
-for i, mem in enumerate(memory):
-    mem.assignment = AbsAssignment(partial(update_mem, mem, i, mem_addr, mem_write_data, mem_write_enable, clk))
-
-# Leitura da memória (assíncrona)
-mem_read_data.assignment = AbsAssignment(partial(read_mem, memory, mem_addr))
-mem_read_data.influence_list = [mux_out]
-
-#. Multiplexador (mem_to_reg seleciona entre alu_out e mem_read_data)
-# Se mem_to_reg = 0: saída da ALU
-# Se mem_to_reg = 1: saída da memória
-alu_out.influence_list = [mem_addr, mux_out]
-mem_to_reg.influence_list = [mux_out]
-mux_out.assignment = AbsAssignment(partial(mux_2to1, mem_to_reg, alu_out, mem_read_data))
-mux_out.influence_list = [rf_write_data]
-
-mips = Component("mips16x")
-for bus in buses:
-    assert bus.id is not None, "Bus must have an ID before being added to a component"
-    mips.buses[bus.id] = bus
+from codec import bit_value, to_int
+from compiler import CompiledNetlist
+from isa import ArchState
+from loader import load_image
+from schedule import LevelizedComponent
+from storage import ByteMemory, RegisterFile
+
+
+# Cabeçalho do snapshot: magic, versão, tamanhos das memórias, nº de registradores,
+# nº de barramentos, crc32 dos ids, nível do clock, borda de subida, flag de compressão
+SNAPSHOT_MAGIC = b'M16SNAP'
+SNAPSHOT_VERSION = 1
+_SNAPSHOT_HEADER = struct.Struct('<7sHIIHHI???')
+
+_CLK_LOW = bit_value(0, 1)
+_CLK_HIGH = bit_value(1, 1)
+
+
+class RunResult(NamedTuple):
+    """Resultado de Mips16x.run: ciclos executados, motivo da parada e PC final"""
+    cycles: int
+    reason: str  # 'halt', 'breakpoint', 'watch', 'until' ou 'budget'
+    pc: int
+
+
+class Mips16x:
+    """Instância do mips16x: componente elaborado e referências para seus blocos
+
+    Cada instância é independente (barramentos, clock, registradores e memórias
+    próprios), então várias podem conviver no mesmo processo e ser reutilizadas
+    entre programas com reset().
+    """
+    def __init__(
+            self,
+            component: Component,
+            register_file: RegisterFile,
+            memory: ByteMemory,
+            instruction_memory: ByteMemory,
+            clk: ClockBus,
+    ) -> None:
+        self.component = component
+        self.buses = component.buses
+        self.register_file = register_file
+        self.registers = register_file.registers
+        self.memory = memory
+        self.instruction_memory = instruction_memory
+        self.clk = clk
+        self.pc = self.buses['pc']
+        self.compiled = None
+        # Valores de elaboração, usados pelo reset (as células de armazenamento têm reset próprio)
+        self._reset_values = {
+            bus_id: bus.value for bus_id, bus in self.buses.items()
+            if bus_id not in memory.cells and bus_id not in instruction_memory.cells
+        }
+        for reg in self.registers:
+            del self._reset_values[reg.id]
+        # Barramentos do datapath salvos no snapshot (o clock é salvo à parte)
+        self._state_buses = [
+            (bus, len(bus.value.raw_value)) for bus_id, bus in self.buses.items()
+            if bus_id in self._reset_values and bus is not clk
+        ]
+        self._state_ids_crc = zlib.crc32('\0'.join(bus.id for bus, _ in self._state_buses).encode())
+
+    def reset(self, clear_memory: bool = False) -> None:
+        """Volta ao estado de elaboração (PC inicial, barramentos e registradores zerados)
+
+        Com `clear_memory`, também zera a memória de dados e a de instruções.
+        """
+        for bus_id, value in self._reset_values.items():
+            self.buses[bus_id].value = value
+        self.clk.rising = False
+        self.register_file.clear()
+        if clear_memory:
+            self.memory.clear()
+            self.instruction_memory.clear()
+
+    def load_program(self, image: bytes | str, base: int = 0) -> None:
+        """Carrega uma imagem (bytes ou caminho de arquivo aceito pelo loader) na memória de instruções"""
+        if isinstance(image, str):
+            load_image(self.instruction_memory, image, base=base)
+        else:
+            self.instruction_memory.load(image, base)
+
+    def compile(self, cache_dir: str | os.PathLike | None = None) -> CompiledNetlist:
+        """Passa a executar os ciclos pela netlist compilada (ver compiler.py)"""
+        self.compiled = CompiledNetlist(self.component, self.clk, cache_dir)
+        return self.compiled
+
+    def cycle(self, count: int = 1) -> None:
+        """Executa `count` ciclos completos de clock (fase baixa e fase alta)"""
+        if self.compiled is not None:
+            self.compiled.run(count)
+            return
+
+        clk = self.clk
+        stabilize = self.component.stabilize
+        for _ in range(count):
+            clk.value = _CLK_LOW
+            stabilize()
+            clk.value = _CLK_HIGH
+            stabilize()
+
+    def run(
+            self,
+            max_cycles: int,
+            until: Callable[['Mips16x'], bool] | None = None,
+            halt: bool = True,
+            breakpoints: Iterable[int] = (),
+            watch: Iterable[int] = (),
+    ) -> RunResult:
+        """Executa ciclos até uma condição de parada ou até esgotar `max_cycles`
+
+        As condições são verificadas ao fim de cada ciclo, nesta ordem:
+        - `halt`: a instrução executada desvia para o próprio endereço (JUMP ou
+          BEQ para si mesma); a partir daí o estado não muda mais;
+        - `breakpoints`: o próximo PC é um dos endereços (a instrução ainda não
+          foi executada; chamar run de novo a executa);
+        - `watch`: algum dos registradores indicados mudou de valor;
+        - `until(cpu)`: predicado qualquer sobre a instância.
+
+        Com a netlist compilada e alguma condição ativa, os ciclos são executados
+        um a um.
+        """
+        breakpoints = frozenset(addr & 0xFFFF for addr in breakpoints)
+        watch = tuple(watch)
+        if not (until or halt or breakpoints or watch):
+            self.cycle(max_cycles)
+            return RunResult(max_cycles, 'budget', to_int(self.pc.value.raw_value))
+
+        pc = self.pc
+        next_pc = self.buses['next_pc']
+        registers = self.register_file.data
+        watched = [registers[i] for i in watch]
+
+        for cycles in range(1, max_cycles + 1):
+            self.cycle()
+
+            reason = None
+            target = next_pc.value
+            if halt and target == pc.value:
+                reason = 'halt'
+            elif breakpoints and to_int(target.raw_value) in breakpoints:
+                reason = 'breakpoint'
+            elif watch:
+                current = [registers[i] for i in watch]
+                if current != watched:
+                    reason = 'watch'
+                    watched = current
+            if reason is None and until is not None and until(self):
+                reason = 'until'
+
+            if reason is not None:
+                return RunResult(cycles, reason, to_int(pc.value.raw_value))
+
+        return RunResult(max_cycles, 'budget', to_int(pc.value.raw_value))
+
+    def snapshot(self, compress: bool = True) -> bytes:
+        """Serializa o estado completo: PC e demais barramentos, registradores, memórias e clock
+
+        As células de memória já criadas (que aparecem no VCD) também são
+        registradas, para que o restore mantenha o mesmo conjunto de sinais.
+        """
+        header = _SNAPSHOT_HEADER.pack(
+            SNAPSHOT_MAGIC, SNAPSHOT_VERSION, self.instruction_memory.size, self.memory.size,
+            len(self.register_file), len(self._state_buses), self._state_ids_crc,
+            self.clk.value.raw_value[0], self.clk.rising, compress,
+        )
+
+        values = bytearray()
+        for bus, width in self._state_buses:
+            values += to_int(bus.value.raw_value).to_bytes((width + 7) // 8, 'little')
+
+        cells = array('I', sorted(self.memory.cells)), array('I', sorted(self.instruction_memory.cells))
+        body = b''.join((
+            bytes(values),
+            self.register_file.data.tobytes(),
+            struct.pack('<II', len(cells[0]), len(cells[1])),
+            cells[0].tobytes(),
+            cells[1].tobytes(),
+            self.memory.data,
+            self.instruction_memory.data,
+        ))
+
+        return header + (zlib.compress(body, 1) if compress else body)
+
+    def restore(self, blob: bytes) -> None:
+        """Restaura um estado gerado por snapshot() (de uma instância com a mesma netlist)"""
+        magic, version, imem_size, dmem_size, reg_count, bus_count, ids_crc, level, rising, compressed = (
+            _SNAPSHOT_HEADER.unpack_from(blob)
+        )
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError('Not a mips16x snapshot (or unsupported version)')
+        if (imem_size, dmem_size, reg_count) != (self.instruction_memory.size, self.memory.size, len(self.register_file)):
+            raise ValueError(
+                f'Snapshot of a mips16x with {imem_size}/{dmem_size} bytes of memory and {reg_count} registers '
+                f'does not match this instance'
+            )
+        if bus_count != len(self._state_buses) or ids_crc != self._state_ids_crc:
+            raise ValueError('Snapshot was taken from a different netlist')
+
+        body = memoryview(blob)[_SNAPSHOT_HEADER.size:]
+        if compressed:
+            body = memoryview(zlib.decompress(body))
+
+        offset = 0
+        for bus, width in self._state_buses:
+            size = (width + 7) // 8
+            bus.value = bit_value(int.from_bytes(body[offset:offset + size], 'little'), width)
+            offset += size
+
+        size = len(self.register_file) * self.register_file.data.itemsize
+        self.register_file.data[:] = array(self.register_file.data.typecode, bytes(body[offset:offset + size]))
+        offset += size
+
+        mem_cells, imem_cells = struct.unpack_from('<II', body, offset)
+        offset += 8
+        for memory, count in ((self.memory, mem_cells), (self.instruction_memory, imem_cells)):
+            for idx in array('I', bytes(body[offset:offset + 4 * count])):
+                memory.cell(idx)
+            offset += 4 * count
+
+        self.memory.view[:] = body[offset:offset + dmem_size]
+        offset += dmem_size
+        self.instruction_memory.view[:] = body[offset:offset + imem_size]
+
+        self.clk.value = bit_value(level, 1)
+        self.clk.rising = rising
+
+    def state(self) -> ArchState:
+        """Estado arquitetural no mesmo formato de isa.IsaSimulator.state()"""
+        return ArchState(to_int(self.pc.value.raw_value), tuple(self.register_file.data), bytes(self.memory.data))
+
+
+def build_mips16x(
+        imem_size: int = 65536,
+        dmem_size: int = 65536,
+        initial_pc: int = 0xFFFE,
+        trace_memory: bool = True,
+        levelized: bool = True,
+        early_cutoff: bool = True,
+) -> Mips16x:
+    """Elabora uma nova instância independente do datapath do mips16x
+
+    Com `levelized` (padrão), cada fase de clock avalia a netlist uma única vez
+    em ordem topológica; sem ele, usa a propagação por eventos do flote. Com
+    `early_cutoff` (padrão), o modo levelizado só reavalia os barramentos cujas
+    entradas mudaram.
+    """
+    # Declarations of buses
+
+    #* Clock (detecta a borda de subida uma vez por transição)
+    clk = ClockBus()
+    clk.id = "clk"
+    clk.value = bit_value(0, 1)
+
+    #* Program Counter (PC)
+    pc = BitBus()
+    pc.id = "pc"
+    # Inicializa PC em -2 (0xFFFE) para que a primeira borda de subida leve o PC a 0
+    pc.value = bit_value(initial_pc, 16)  # Padrão: 1111111111111110 = -2 em complemento de 2
+
+    # PC + 2 (próxima instrução sequencial)
+    pc_plus_2 = BitBus()
+    pc_plus_2.id = "pc_plus_2"
+    pc_plus_2.value = bit_value(0, 16)
+
+    # Constante 2 para somar ao PC
+    const_2 = BitBus()
+    const_2.id = "const_2"
+    const_2.value = bit_value(2, 16)  # 2 em binário
+
+    # Branch offset deslocado
+    branch_offset = BitBus()
+    branch_offset.id = "branch_offset"
+    branch_offset.value = bit_value(0, 16)
+
+    # Endereço de branch (PC + 2 + offset << 1)
+    branch_addr = BitBus()
+    branch_addr.id = "branch_addr"
+    branch_addr.value = bit_value(0, 16)
+
+    # Sinal zero da ALU
+    zero = BitBus()
+    zero.id = "zero"
+    zero.value = bit_value(0, 1)
+
+    # Sinais de controle
+    branch = BitBus()
+    branch.id = "branch"
+    branch.value = bit_value(0, 1)
+
+    jump = BitBus()
+    jump.id = "jump"
+    jump.value = bit_value(0, 1)
+
+    # Multiplexadores para o próximo PC
+    pc_src = BitBus()  # Branch and zero
+    pc_src.id = "pc_src"
+    pc_src.value = bit_value(0, 1)
+
+    branch_or_seq = BitBus()  # Saída do mux branch
+    branch_or_seq.id = "branch_or_seq"
+    branch_or_seq.value = bit_value(0, 16)
+
+    jump_addr = BitBus()  # Endereço de jump
+    jump_addr.id = "jump_addr"
+    jump_addr.value = bit_value(0, 16)
+
+    next_pc = BitBus()  # Próximo valor do PC
+    next_pc.id = "next_pc"
+    next_pc.value = bit_value(0, 16)
+
+    #* Instruction Memory (bytearray cobrindo os 64 KiB, carregada via loader)
+    # Cada instrução de 16 bits ocupa 2 bytes consecutivos
+    # Formato da instrução: [opcode(4) | rs(4) | rt(4) | rd(4)]
+    instruction_memory = ByteMemory(imem_size, 'imem', trace=trace_memory)
+
+    # Instrução atual
+    instruction = BitBus()
+    instruction.id = "instruction"
+    instruction.value = bit_value(0, 16)
+
+    # Campos da instrução
+    opcode = BitBus()
+    opcode.id = "opcode"
+    opcode.value = bit_value(0, 4)
+
+    rs = BitBus()
+    rs.id = "rs"
+    rs.value = bit_value(0, 4)
+
+    rt = BitBus()
+    rt.id = "rt"
+    rt.value = bit_value(0, 4)
+
+    rd = BitBus()
+    rd.id = "rd"
+    rd.value = bit_value(0, 4)
+
+    # Multiplexador para selecionar entre rt e rd (reg_dst)
+    reg_dst = BitBus()
+    reg_dst.id = "reg_dst"
+    reg_dst.value = bit_value(0, 1)
+
+    write_reg = BitBus()
+    write_reg.id = "write_reg"
+    write_reg.value = bit_value(0, 4)
+
+    # Extensor de sinal (rd de 4 bits para 16 bits)
+    immediate = BitBus()
+    immediate.id = "immediate"
+    immediate.value = bit_value(0, 16)
+
+    # Sinal de controle ALUSrc
+    alu_src = BitBus()
+    alu_src.id = "alu_src"
+    alu_src.value = bit_value(0, 1)
+
+    #* ALU
+    alu_a = BitBus()
+    alu_a.id = "alu_a"
+    alu_a.value = bit_value(0, 16)
+    alu_b = BitBus()
+    alu_b.id = "alu_b"
+    alu_b.value = bit_value(0, 16)
+    alu_b_mux = BitBus()
+    alu_b_mux.id = "alu_b_mux"
+    alu_b_mux.value = bit_value(0, 16)
+    alu_op = BitBus()
+    alu_op.id = "alu_op"
+    alu_op.value = bit_value(0, 3)
+    alu_out = BitBus()
+    alu_out.id = "alu_out"
+    alu_out.value = bit_value(0, 16)
+
+    #* Register Bank (array('H') com 16 registradores de 16 bits)
+    register_file = RegisterFile(16)
+    registers = register_file.registers
+
+    # Strobe da porta de escrita (1 quando o registrador endereçado foi escrito)
+    rf_write_strobe = BitBus()
+    rf_write_strobe.id = "rf_write_strobe"
+    rf_write_strobe.value = bit_value(0, 1)
+
+    rf_write_enable = BitBus()
+    rf_write_enable.id = "rf_write_enable"
+    rf_write_enable.value = bit_value(0, 1)
+
+    rf_read_addr1 = BitBus()
+    rf_read_addr1.id = "rf_read_addr1"
+    rf_read_addr1.value = bit_value(0, 4)
+    rf_read_data1 = BitBus()
+    rf_read_data1.id = "rf_read_data1"
+    rf_read_data1.value = bit_value(0, 16)
+
+    rf_read_addr2 = BitBus()
+    rf_read_addr2.id = "rf_read_addr2"
+    rf_read_addr2.value = bit_value(0, 4)
+    rf_read_data2 = BitBus()
+    rf_read_data2.id = "rf_read_data2"
+    rf_read_data2.value = bit_value(0, 16)
+
+    rf_write_addr = BitBus()
+    rf_write_addr.id = "rf_write_addr"
+    rf_write_addr.value = bit_value(0, 4)
+    rf_write_data = BitBus()
+    rf_write_data.id = "rf_write_data"
+    rf_write_data.value = bit_value(0, 16)
+
+    #* Data Memory (bytearray cobrindo os 64 KiB do espaço de endereçamento)
+    # Com trace_memory, só os bytes escritos (ou inspecionados via memory[i]) aparecem no VCD
+    memory = ByteMemory(dmem_size, 'mem', trace=trace_memory)
+
+    # Strobe da porta de escrita (1 quando a palavra endereçada foi escrita)
+    mem_write_strobe = BitBus()
+    mem_write_strobe.id = "mem_write_strobe"
+    mem_write_strobe.value = bit_value(0, 1)
+
+    mem_addr = BitBus()
+    mem_addr.id = "mem_addr"
+    mem_addr.value = bit_value(0, 16)
+    mem_write_data = BitBus()
+    mem_write_data.id = "mem_write_data"
+    mem_write_data.value = bit_value(0, 16)
+    mem_read_data = BitBus()
+    mem_read_data.id = "mem_read_data"
+    mem_read_data.value = bit_value(0, 16)
+    mem_write_enable = BitBus()
+    mem_write_enable.id = "mem_write_enable"
+    mem_write_enable.value = bit_value(0, 1)
+
+    #* Multiplexador (seleciona entre alu_out e mem_read_data)
+    mem_to_reg = BitBus()
+    mem_to_reg.id = "mem_to_reg"
+    mem_to_reg.value = bit_value(0, 1)
+    mux_out = BitBus()
+    mux_out.id = "mux_out"
+    mux_out.value = bit_value(0, 16)
+
+    buses = [
+        clk,
+        pc,
+        pc_plus_2,
+        const_2,
+        branch_offset,
+        branch_addr,
+        zero,
+        branch,
+        jump,
+        pc_src,
+        branch_or_seq,
+        jump_addr,
+        next_pc,
+        instruction,
+        opcode,
+        rs,
+        rt,
+        rd,
+        reg_dst,
+        write_reg,
+        immediate,
+        alu_src,
+        alu_a,
+        alu_b,
+        alu_b_mux,
+        alu_op,
+        alu_out,
+        rf_write_enable,
+        rf_read_addr1,
+        rf_read_data1,
+        rf_read_addr2,
+        rf_read_data2,
+        rf_write_addr,
+        rf_write_data,
+        mem_addr,
+        mem_write_data,
+        mem_read_data,
+        mem_write_enable,
+        mem_to_reg,
+        mux_out,
+        rf_write_strobe,
+        mem_write_strobe,
+    ] + registers
+
+    # Elaboration of the component
+    #. Clock
+    clk.influence_list = [pc, rf_write_strobe]
+
+    #. Program Counter (PC) - agora recebe next_pc ao invés de incrementar internamente
+    pc.assignment = AbsAssignment(partial(update_pc_reg, pc, next_pc, clk))
+    # PC deve influenciar a porta de escrita para garantir que ela escreva após a troca de instrução
+    pc.influence_list = [instruction, pc_plus_2, rf_write_strobe]
+
+    #. Lógica de Branch e Jump
+    # PC + 2 (próxima instrução sequencial)
+    pc_plus_2.assignment = AbsAssignment(partial(add_bus, pc, const_2))
+    pc_plus_2.influence_list = [branch_addr, branch_or_seq]
+
+    # Branch offset = immediate << 1
+    branch_offset.assignment = AbsAssignment(partial(shift_left_1, immediate))
+    branch_offset.influence_list = [branch_addr]
+
+    # Branch address = PC + 2 + (offset << 1)
+    branch_addr.assignment = AbsAssignment(partial(add_bus, pc_plus_2, branch_offset))
+    branch_addr.influence_list = [branch_or_seq]
+
+    # Sinal zero da ALU
+    zero.assignment = AbsAssignment(partial(alu_zero, alu_out))
+    zero.influence_list = [pc_src]
+
+    # PC_src = Branch AND Zero
+    branch.influence_list = [pc_src]
+    pc_src.assignment = AbsAssignment(partial(and_gate, branch, zero))
+    pc_src.influence_list = [branch_or_seq]
+
+    # Multiplexador Branch: seleciona entre PC+2 ou branch_addr
+    branch_or_seq.assignment = AbsAssignment(partial(mux_2to1, pc_src, pc_plus_2, branch_addr))
+    branch_or_seq.influence_list = [next_pc]
+
+    # Jump address = PC[15:12] | (instr[11:0] << 1)
+    # Extrai os 12 bits inferiores da instrução (rd + rt + rs = 12 bits)
+    jump_addr.assignment = AbsAssignment(partial(concat_jump_addr, pc, instruction))
+    jump_addr.influence_list = [next_pc]
+
+    # Multiplexador Jump: seleciona entre branch_or_seq ou jump_addr
+    jump.influence_list = [next_pc]
+    next_pc.assignment = AbsAssignment(partial(mux_2to1, jump, branch_or_seq, jump_addr))
+    next_pc.influence_list = []  # Removido PC para evitar loop circular
+
+    #. Instruction Memory (leitura assíncrona)
+    instruction.assignment = AbsAssignment(partial(read_mem, instruction_memory, pc))
+    instruction.influence_list = [opcode, rs, rt, rd]
+
+    #. Decodificação da Instrução
+    opcode.assignment = AbsAssignment(partial(extract_opcode, instruction))
+    opcode.influence_list = [reg_dst, alu_src, mem_to_reg, rf_write_enable, mem_write_enable, branch, alu_op, jump]
+
+    #. Unidade de Controle
+    # ROM de decodificação montada uma única vez; cada sinal lê sua coluna da linha do opcode
+    control_rom = build_control_rom()
+    control_buses = [reg_dst, alu_src, mem_to_reg, rf_write_enable, mem_write_enable, branch, alu_op, jump]
+    for i, control_bus in enumerate(control_buses):
+        assert control_bus.id == CONTROL_SIGNALS[i][0], "Control buses must follow CONTROL_SIGNALS order"
+        control_bus.assignment = AbsAssignment(partial(control_signal, control_rom, i, opcode))
+
+    rs.assignment = AbsAssignment(partial(extract_rs, instruction))
+    rs.influence_list = [rf_read_addr1]
+
+    rt.assignment = AbsAssignment(partial(extract_rt, instruction))
+    rt.influence_list = [rf_read_addr2, write_reg]
+
+    rd.assignment = AbsAssignment(partial(extract_rd, instruction))
+    rd.influence_list = [write_reg, immediate]
+
+    #. Multiplexador reg_dst (seleciona entre rt e rd para o endereço de escrita)
+    reg_dst.influence_list = [write_reg]
+    write_reg.assignment = AbsAssignment(partial(mux_4bit_2to1, reg_dst, rt, rd))
+    write_reg.influence_list = [rf_write_addr]
+
+    #. Extensor de sinal (rd de 4 bits para 16 bits para instruções tipo I)
+    immediate.assignment = AbsAssignment(partial(sign_extend_4to16, rd))
+    immediate.influence_list = [alu_b_mux]
+
+    #. ALU
+    alu_a.assignment = AbsAssignment(partial(buffer, rf_read_data1))
+    alu_a.influence_list = [alu_out]
+
+    # Multiplexador ALUSrc na entrada B da ALU
+    alu_b.assignment = AbsAssignment(partial(buffer, rf_read_data2))
+    alu_b.influence_list = [alu_b_mux]
+
+    alu_src.influence_list = [alu_b_mux]
+    alu_b_mux.assignment = AbsAssignment(partial(mux_alu_src, alu_src, alu_b, immediate))
+    alu_b_mux.influence_list = [alu_out]
+
+    alu_out.assignment = AbsAssignment(partial(alu_out_op, alu_a, alu_b_mux, alu_op))
+
+    #. Register Bank
+    rf_write_enable.influence_list = [rf_write_strobe]
+
+    # Uma única porta de escrita: só o registrador endereçado é atualizado na borda de subida
+    rf_write_strobe.assignment = AbsAssignment(
+        partial(update_reg_file, register_file, rf_write_addr, rf_write_data, rf_write_enable, clk)
+    )
+
+    # Conectar rs a rf_read_addr1
+    rf_read_addr1.assignment = AbsAssignment(partial(buffer, rs))
+    rf_read_addr1.influence_list = [rf_read_data1]
+    rf_read_data1.assignment = AbsAssignment(partial(read_reg_file, register_file, rf_read_addr1))
+    rf_read_data1.influence_list = [alu_a]
+
+    # Conectar rt a rf_read_addr2
+    rf_read_addr2.assignment = AbsAssignment(partial(buffer, rt))
+    rf_read_addr2.influence_list = [rf_read_data2]
+    rf_read_data2.assignment = AbsAssignment(partial(read_reg_file, register_file, rf_read_addr2))
+    rf_read_data2.influence_list = [alu_b, mem_write_data]
+
+    # Conectar write_reg a rf_write_addr
+    rf_write_addr.assignment = AbsAssignment(partial(buffer, write_reg))
+    rf_write_addr.influence_list = [rf_write_strobe]
+    rf_write_data.influence_list = [rf_write_strobe]
+    rf_write_data.assignment = AbsAssignment(partial(buffer, mux_out))
+
+    #. Data Memory
+    # A saída da ALU entra como endereço da memória
+    mem_addr.assignment = AbsAssignment(partial(buffer, alu_out))
+    mem_addr.influence_list = [mem_read_data, mem_write_strobe]
+
+    # O dado a ser escrito na memória vem do segundo registrador lido
+    mem_write_data.assignment = AbsAssignment(partial(buffer, rf_read_data2))
+    mem_write_data.influence_list = [mem_write_strobe]
+
+    # Porta de escrita da memória (única avaliação por mudança, O(1) no bytearray)
+    mem_write_enable.influence_list = [mem_write_strobe]
+    clk.influence_list = clk.influence_list + [mem_write_strobe]
+
+    mem_write_strobe.assignment = AbsAssignment(
+        partial(update_data_mem, memory, mem_addr, mem_write_data, mem_write_enable, clk)
+    )
+
+    # Leitura da memória (assíncrona)
+    mem_read_data.assignment = AbsAssignment(partial(read_mem, memory, mem_addr))
+    mem_read_data.influence_list = [mux_out]
+
+    #. Multiplexador (mem_to_reg seleciona entre alu_out e mem_read_data)
+    # Se mem_to_reg = 0: saída da ALU
+    # Se mem_to_reg = 1: saída da memória
+    alu_out.influence_list = [mem_addr, mux_out]  # Alimenta rf_write_data através do mux
+    mem_to_reg.influence_list = [mux_out]
+    mux_out.assignment = AbsAssignment(partial(mux_2to1, mem_to_reg, alu_out, mem_read_data))
+    mux_out.influence_list = [rf_write_data]
+
+    mips = LevelizedComponent("mips16x", levelized, early_cutoff)
+    for bus in buses:
+        assert bus.id is not None, "Bus must have an ID before being added to a component"
+        mips.buses[bus.id] = bus
+    memory.attach(mips.buses)
+    instruction_memory.attach(mips.buses)
+    mips.elaborate()
+
+    return Mips16x(mips, register_file, memory, instruction_memory, clk)
+
+
+# Instância padrão usada pelos testbenches
+cpu = build_mips16x()
+mips = cpu.component
+registers = cpu.registers
+register_file = cpu.register_file
+memory = cpu.memory
+instruction_memory = cpu.instruction_memory
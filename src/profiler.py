@@ -0,0 +1,164 @@
+"""Perfil de avaliação por barramento
+
+Todas as atualizações da netlist passam por AbsAssignment.evaluate(). Com o
+profiler ativo, a atribuição de cada barramento é trocada por uma
+ProfiledAssignment, que registra o número de avaliações, o tempo acumulado e
+quantas vezes o novo valor foi igual ao anterior. Ao desativar, as atribuições
+originais voltam ao lugar: desligado, o profiler não custa nada.
+
+A netlist compilada (compiler.py) não passa pelas atribuições e não é medida.
+
+    with BusProfiler(cpu.component) as profiler:
+        cpu.cycle(1000)
+    print(profiler.report())
+"""
+import argparse
+from dataclasses import dataclass
+from functools import partial
+from time import perf_counter
+
+from flote.backend.python.core.buses import BaseBus
+from flote.backend.python.core.component import Component
+
+from abstract import AbsAssignment
+
+
+@dataclass
+class BusStats:
+    """Contadores de um barramento"""
+    bus_id: str
+    function: str
+    evaluations: int = 0
+    seconds: float = 0.0
+    unchanged: int = 0  # Avaliações que produziram o mesmo valor que o barramento já tinha
+
+
+class ProfiledAssignment(AbsAssignment):
+    """AbsAssignment que mede a atribuição original de um barramento
+
+    Mantém o mesmo `assignment` (partial) da original, então o levelize e o
+    compilador continuam enxergando as mesmas dependências.
+    """
+    def __init__(self, original: AbsAssignment, bus: BaseBus, stats: BusStats) -> None:
+        super().__init__(original.assignment)
+        self.original = original
+        self.bus = bus
+        self.stats = stats
+
+    def evaluate(self):
+        stats = self.stats
+        start = perf_counter()
+        value = self.original.evaluate()
+        stats.seconds += perf_counter() - start
+        stats.evaluations += 1
+        if value == self.bus.value:
+            stats.unchanged += 1
+        return value
+
+
+def _function_name(assignment: AbsAssignment) -> str:
+    function = assignment.assignment
+    if isinstance(function, partial):
+        function = function.func
+    return getattr(function, '__name__', type(function).__name__)
+
+
+class BusProfiler:
+    """Instrumenta as atribuições dos barramentos de um componente enquanto estiver ativo"""
+    def __init__(self, component: Component) -> None:
+        self.component = component
+        self.stats: dict[str, BusStats] = {}
+        self._originals: dict[BaseBus, AbsAssignment] = {}
+
+    def __enter__(self) -> 'BusProfiler':
+        self.enable()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.disable()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._originals)
+
+    def enable(self) -> None:
+        """Troca as atribuições pelas versões instrumentadas (os contadores acumulam entre ativações)"""
+        if self.enabled:
+            return
+
+        for bus in self.component.buses.values():
+            assignment = bus.assignment
+            if not isinstance(assignment, AbsAssignment):
+                continue
+
+            stats = self.stats.get(bus.id)
+            if stats is None:
+                stats = self.stats[bus.id] = BusStats(bus.id, _function_name(assignment))
+            self._originals[bus] = assignment
+            bus.assignment = ProfiledAssignment(assignment, bus, stats)
+
+    def disable(self) -> None:
+        """Restaura as atribuições originais"""
+        for bus, assignment in self._originals.items():
+            bus.assignment = assignment
+        self._originals.clear()
+
+    def reset(self) -> None:
+        for stats in self.stats.values():
+            stats.evaluations = 0
+            stats.seconds = 0.0
+            stats.unchanged = 0
+
+    def ranking(self) -> list[BusStats]:
+        """Barramentos em ordem decrescente de tempo acumulado"""
+        return sorted(self.stats.values(), key=lambda stats: stats.seconds, reverse=True)
+
+    def by_function(self) -> list[BusStats]:
+        """Contadores somados por função de atribuição (ex.: todas as leituras de memória juntas)"""
+        totals: dict[str, BusStats] = {}
+        for stats in self.stats.values():
+            total = totals.setdefault(stats.function, BusStats(stats.function, stats.function))
+            total.evaluations += stats.evaluations
+            total.seconds += stats.seconds
+            total.unchanged += stats.unchanged
+        return sorted(totals.values(), key=lambda stats: stats.seconds, reverse=True)
+
+    def report(self, limit: int | None = 20, group: bool = False) -> str:
+        """Relatório dos barramentos (ou funções, com `group`) mais caros"""
+        rows = self.by_function() if group else self.ranking()
+        total = sum(stats.seconds for stats in rows) or 1.0
+
+        lines = [
+            f'{"function" if group else "bus":<20} {"evals":>9} {"total ms":>9} {"us/eval":>8} '
+            f'{"share":>6} {"unchanged":>9}' + ('' if group else '  function')
+        ]
+        for stats in rows[:limit]:
+            per_eval = stats.seconds / stats.evaluations * 1e6 if stats.evaluations else 0.0
+            unchanged = stats.unchanged / stats.evaluations if stats.evaluations else 0.0
+            line = (
+                f'{stats.bus_id:<20} {stats.evaluations:>9,} {stats.seconds * 1e3:>9.2f} {per_eval:>8.2f} '
+                f'{stats.seconds / total:>6.1%} {unchanged:>9.1%}'
+            )
+            lines.append(line if group else f'{line}  {stats.function}')
+
+        return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    from mips16x import build_mips16x
+
+    parser = argparse.ArgumentParser(description='Profile the bus evaluations of the mips16x netlist')
+    parser.add_argument('image', help='program image (.bin, .hex, .mem or .s)')
+    parser.add_argument('-c', '--cycles', type=int, default=1000, help='clock cycles to simulate')
+    parser.add_argument('-n', '--top', type=int, default=20, help='buses listed in the report')
+    parser.add_argument('--event-driven', action='store_true', help='use the event-driven evaluation of flote')
+    args = parser.parse_args()
+
+    cpu = build_mips16x(levelized=not args.event_driven)
+    cpu.load_program(args.image)
+    with BusProfiler(cpu.component) as profiler:
+        cpu.cycle(args.cycles)
+
+    print(profiler.report(args.top))
+    print()
+    print(profiler.report(args.top, group=True))
@@ -0,0 +1,179 @@
+"""Cache persistente de resultados de simulação, endereçado por conteúdo
+
+A chave é o hash da imagem do programa, da memória de dados inicial, do
+orçamento de ciclos, dos tamanhos das memórias e da impressão digital do modelo
+(fontes de abstract.py, mips16x.py e dos módulos que definem a sua semântica,
+mais a versão do flote). Qualquer mudança no modelo invalida todas as entradas.
+As execuções partem sempre do estado de reset.
+
+Cada entrada guarda o estado arquitetural final e os ciclos executados; o
+pass/fail é recalculado a partir do estado (os valores esperados de um job
+podem mudar sem exigir nova simulação). O diretório é limitado em bytes, com
+descarte LRU pela data de acesso (mtime, atualizada a cada acerto).
+
+O cache é opcional: batch.py usa --cache e os testbenches a variável de
+ambiente MIPS16X_RESULT_CACHE (diretório).
+"""
+import hashlib
+import os
+import struct
+import zlib
+from array import array
+from functools import lru_cache
+from importlib.metadata import version
+from pathlib import Path
+
+from isa import ArchState
+
+ENV_VAR = 'MIPS16X_RESULT_CACHE'
+DEFAULT_MAX_BYTES = 256 << 20
+
+# Fontes que definem o comportamento do modelo
+MODEL_SOURCES = ('abstract.py', 'mips16x.py', 'storage.py', 'codec.py', 'schedule.py')
+
+# Cabeçalho da entrada: magic, versão, ciclos executados, PC, nº de registradores
+ENTRY_MAGIC = b'M16RES'
+ENTRY_VERSION = 1
+_ENTRY_HEADER = struct.Struct('<6sHIHH')
+
+
+@lru_cache(maxsize=None)
+def model_fingerprint() -> str:
+    """Hash das fontes do modelo e da versão do flote"""
+    digest = hashlib.sha256(f'flote {version("flote")}'.encode())
+    for name in MODEL_SOURCES:
+        digest.update(b'\0' + name.encode() + b'\0')
+        digest.update((Path(__file__).parent / name).read_bytes())
+    return digest.hexdigest()
+
+
+def load_state(cpu, state: ArchState) -> None:
+    """Coloca o estado arquitetural de uma entrada (PC, registradores, memória) em uma instância Mips16x"""
+    from codec import bit_value
+
+    cpu.register_file.data[:] = array(cpu.register_file.data.typecode, state.registers)
+    cpu.memory.view[:] = state.memory
+    cpu.pc.value = bit_value(state.pc, 16)
+
+
+class ResultCache:
+    """Diretório de resultados indexados por result_key, com tamanho máximo em bytes"""
+    def __init__(self, path: str | os.PathLike, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size: int | None = None  # Calculado no primeiro put
+
+    @classmethod
+    def from_env(cls) -> 'ResultCache | None':
+        """Cache no diretório de MIPS16X_RESULT_CACHE, ou None se a variável não estiver definida"""
+        path = os.environ.get(ENV_VAR)
+        return cls(path) if path else None
+
+    @staticmethod
+    def key(
+            image: bytes,
+            cycles: int,
+            memory: bytes = b'',
+            imem_size: int = 65536,
+            dmem_size: int = 65536,
+    ) -> str:
+        digest = hashlib.sha256(model_fingerprint().encode())
+        digest.update(struct.pack('<QIIII', cycles, imem_size, dmem_size, len(image), len(memory)))
+        digest.update(image)
+        digest.update(memory)
+        return digest.hexdigest()
+
+    def _entry(self, key: str) -> Path:
+        return self.path / key[:2] / f'{key}.res'
+
+    def get(self, key: str) -> tuple[ArchState, int] | None:
+        """Estado final e ciclos executados, ou None se a chave não estiver no cache"""
+        entry = self._entry(key)
+        try:
+            blob = entry.read_bytes()
+            os.utime(entry)  # Acesso recente para o LRU
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        try:
+            magic, entry_version, cycles, pc, reg_count = _ENTRY_HEADER.unpack_from(blob)
+            if magic != ENTRY_MAGIC or entry_version != ENTRY_VERSION:
+                raise ValueError(f'unknown entry format {magic!r} v{entry_version}')
+            offset = _ENTRY_HEADER.size
+            registers = array('H', blob[offset:offset + 2 * reg_count])
+            if len(registers) != reg_count:
+                raise ValueError('truncated register file')
+            memory = zlib.decompress(blob[offset + 2 * reg_count:])
+        except (struct.error, zlib.error, ValueError):  # Entrada truncada ou corrompida: volta a simular
+            self._discard(entry, len(blob))
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return ArchState(pc, tuple(registers), memory), cycles
+
+    def put(self, key: str, state: ArchState, cycles: int) -> None:
+        blob = b''.join((
+            _ENTRY_HEADER.pack(ENTRY_MAGIC, ENTRY_VERSION, cycles, state.pc, len(state.registers)),
+            array('H', state.registers).tobytes(),
+            zlib.compress(state.memory, 6),
+        ))
+
+        entry = self._entry(key)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            replaced = entry.stat().st_size
+        except FileNotFoundError:
+            replaced = 0
+        tmp_path = entry.with_suffix(f'.tmp{os.getpid()}')
+        tmp_path.write_bytes(blob)
+        os.replace(tmp_path, entry)  # Escrita atômica (vários processos podem compartilhar o cache)
+
+        if self._size is None:
+            self._size = self.size()
+        else:
+            self._size += len(blob) - replaced
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def _discard(self, entry: Path, size: int) -> None:
+        try:
+            os.remove(entry)
+        except FileNotFoundError:  # Já removida por outro processo
+            return
+        if self._size is not None:
+            self._size -= size
+
+    def _entries(self) -> list[os.DirEntry]:
+        if not self.path.is_dir():
+            return []
+        return [
+            entry for shard in os.scandir(self.path) if shard.is_dir()
+            for entry in os.scandir(shard.path) if entry.name.endswith('.res')
+        ]
+
+    def size(self) -> int:
+        """Bytes ocupados pelas entradas"""
+        return sum(entry.stat().st_size for entry in self._entries())
+
+    def evict(self) -> None:
+        """Remove as entradas menos recentemente usadas até caber em `max_bytes`"""
+        entries = sorted((entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in self._entries())
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, path in entries:
+            if size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:  # Já removida por outro processo
+                pass
+            size -= entry_size
+        self._size = size
+
+    def clear(self) -> None:
+        for entry in self._entries():
+            os.remove(entry.path)
+        self._size = 0
@@ -0,0 +1,247 @@
+"""Escalonamento estático (levelizado) da lógica combinacional
+
+O Component do flote propaga eventos: a cada atualização todos os barramentos
+entram na fila e cada mudança de valor reenfileira a influence_list, então um
+mesmo barramento pode ser avaliado várias vezes por borda (e portas de escrita
+podem disparar com endereços ainda não estabilizados).
+
+Aqui a netlist é ordenada topologicamente uma única vez, na elaboração. As
+dependências vêm dos argumentos de cada AbsAssignment(partial(...)) e das
+influence_lists; os elementos de estado (barramentos com clock lidos por outros,
+como o pc) só dependem do clock e abrem o escalonamento, de modo que cada nível
+é avaliado no máximo uma vez por fase de clock.
+
+Com corte antecipado (early cutoff), só são avaliados os barramentos com alguma
+entrada alterada desde a última avaliação; um resultado igual ao valor atual
+mantém o mesmo objeto e não propaga. Leituras de armazenamento (banco de
+registradores, memórias) e blocos com clock são avaliados em todas as fases,
+pois dependem de estado que não passa por barramentos. Valores escritos por
+fora do escalonamento (update_signals, reset, restore) são detectados pela
+identidade do objeto no início de cada fase.
+"""
+import argparse
+from collections import deque
+from functools import partial
+
+from flote.backend.python.core.buses import BaseBus
+from flote.backend.python.core.component import Component
+
+from abstract import AbsAssignment, ClockBus
+from storage import ByteMemory, RegisterFile, StorageCell
+
+
+def fan_in(bus: BaseBus) -> list[BaseBus]:
+    """Barramentos lidos pela atribuição de `bus` (argumentos do partial)"""
+    assignment = bus.assignment
+    if isinstance(assignment, AbsAssignment) and isinstance(assignment.assignment, partial):
+        function = assignment.assignment
+        return [arg for arg in (*function.args, *function.keywords.values()) if isinstance(arg, BaseBus)]
+
+    return []
+
+
+def reads_state(bus: BaseBus) -> bool:
+    """Se a atribuição de `bus` lê estado fora dos barramentos (clock ou armazenamento)"""
+    assignment = bus.assignment
+    if isinstance(assignment, AbsAssignment) and isinstance(assignment.assignment, partial):
+        function = assignment.assignment
+        return any(
+            isinstance(arg, (ClockBus, RegisterFile, ByteMemory))
+            for arg in (*function.args, *function.keywords.values())
+        )
+
+    return False
+
+
+def levelize(buses: list[BaseBus]) -> list[list[BaseBus]]:
+    """Agrupa os barramentos com atribuição em níveis, em ordem topológica
+
+    Barramentos sem atribuição (clock, constantes, células de armazenamento) são
+    entradas e não entram no escalonamento. Dentro de cada nível a ordem de
+    declaração é mantida.
+    """
+    scheduled = [bus for bus in buses if bus.assignment is not None]
+    order = {bus: position for position, bus in enumerate(scheduled)}
+
+    # Dependências: argumentos das atribuições mais as influence_lists declaradas
+    sources: dict[BaseBus, set[BaseBus]] = {bus: set(fan_in(bus)) for bus in scheduled}
+    for bus in buses:
+        for influenced in bus.influence_list:
+            if influenced in sources:
+                sources[influenced].add(bus)
+
+    # Elementos de estado: amostram as entradas da fase anterior, então só dependem do clock
+    read_by_others = {source for bus, deps in sources.items() for source in deps if source is not bus}
+    for bus, deps in sources.items():
+        if bus in read_by_others and any(isinstance(dep, ClockBus) for dep in deps):
+            sources[bus] = {dep for dep in deps if isinstance(dep, ClockBus)}
+
+    pending = {bus: {dep for dep in deps if dep in order} for bus, deps in sources.items()}
+    levels: list[list[BaseBus]] = []
+    while pending:
+        level = sorted((bus for bus, deps in pending.items() if not deps), key=order.__getitem__)
+        if not level:
+            loop = ', '.join(sorted(str(bus.id) for bus in pending))
+            raise ValueError(f'Combinational loop between buses: {loop}')
+
+        levels.append(level)
+        for bus in level:
+            del pending[bus]
+        for deps in pending.values():
+            deps.difference_update(level)
+
+    return levels
+
+
+class LevelizedComponent(Component):
+    """Component com escalonamento levelizado e contador de delta cycles
+
+    `delta_cycles` conta as avaliações de barramentos e `redundant_deltas` as
+    reavaliações de um barramento já avaliado na mesma fase (sempre 0 no modo
+    levelizado). Com `levelized=False` usa a propagação por eventos do flote,
+    o que permite comparar os dois modos na mesma netlist; `early_cutoff=False`
+    avalia todo o escalonamento em todas as fases.
+    """
+    def __init__(self, id_: str, levelized: bool = True, early_cutoff: bool = True) -> None:
+        super().__init__(id_)
+        self.levelized = levelized
+        self.early_cutoff = early_cutoff
+        self.levels: list[list[BaseBus]] | None = None
+        self._schedule: list[BaseBus] = []
+        self.reset_counters()
+
+    def elaborate(self) -> None:
+        """Calcula o escalonamento (deve ser refeito se barramentos com atribuição mudarem)"""
+        buses = list(self.buses.values())
+        self.levels = levelize(buses)
+        self._schedule = schedule = [bus for level in self.levels for bus in level]
+        position = {bus: i for i, bus in enumerate(schedule)}
+
+        # Leitores de cada barramento, por posição no escalonamento
+        readers: dict[BaseBus, set[int]] = {bus: set() for bus in buses}
+        for i, bus in enumerate(schedule):
+            for source in fan_in(bus):
+                readers.setdefault(source, set()).add(i)
+        for bus in buses:
+            readers[bus].update(position[influenced] for influenced in bus.influence_list if influenced in position)
+
+        self._readers = [sorted(readers[bus]) for bus in schedule]
+        self._always = [i for i, bus in enumerate(schedule) if reads_state(bus)]
+        self._dirty = [True] * len(schedule)
+
+        # Barramentos observados no início da fase: se o objeto do valor mudou por fora,
+        # o próprio barramento (se escalonado) e seus leitores são reavaliados.
+        # As StorageCell ficam de fora: seus leitores já são cobertos por reads_state.
+        watched = [
+            bus for bus in readers
+            if not isinstance(bus, StorageCell) and (bus in position or readers[bus])
+        ]
+        self._watched = [
+            (bus, sorted(readers[bus] | ({position[bus]} if bus in position else set()))) for bus in watched
+        ]
+        self._seen: list[object] = [None] * len(watched)
+        watch_index = {bus: k for k, bus in enumerate(watched)}
+        self._watch_index = [watch_index[bus] for bus in schedule]
+
+    def reset_counters(self) -> None:
+        self.phases = 0
+        self.delta_cycles = 0
+        self.redundant_deltas = 0
+
+    def stabilize(self) -> None:
+        self.phases += 1
+        if not self.levelized:
+            self._stabilize_event_driven()
+            return
+
+        if self.levels is None:
+            self.elaborate()
+
+        if not self.early_cutoff:
+            for bus in self._schedule:
+                bus.assign()
+            self.delta_cycles += len(self._schedule)
+            return
+
+        dirty = self._dirty
+        for i in self._always:
+            dirty[i] = True
+
+        seen = self._seen
+        for k, (bus, targets) in enumerate(self._watched):
+            value = bus.value
+            if value is not seen[k]:
+                seen[k] = value
+                for i in targets:
+                    dirty[i] = True
+
+        readers = self._readers
+        watch_index = self._watch_index
+        evaluations = 0
+        for i, bus in enumerate(self._schedule):
+            if not dirty[i]:
+                continue
+
+            dirty[i] = False
+            evaluations += 1
+            value = bus.assignment.evaluate()
+            current = bus.value
+            if value is current or value == current:
+                continue  # Mantém o objeto atual e não propaga
+
+            bus.value = value
+            seen[watch_index[i]] = value
+            for j in readers[i]:
+                dirty[j] = True
+
+        self.delta_cycles += evaluations
+
+    def _stabilize_event_driven(self) -> None:
+        """Mesmo algoritmo de Component.stabilize, com contagem de avaliações"""
+        queue = deque(self.buses.values())
+        queued = set(queue)
+        evaluated = set()
+
+        while queue:
+            bus = queue.popleft()
+            queued.discard(bus)
+            if bus.assignment is None:
+                continue
+
+            p_value = bus.value
+            bus.assign()
+            a_value = bus.value
+            if p_value == a_value:
+                bus.value = a_value = p_value  # Valor estável: mantém o mesmo objeto
+
+            self.delta_cycles += 1
+            if bus in evaluated:
+                self.redundant_deltas += 1
+            evaluated.add(bus)
+
+            if p_value != a_value:
+                for bus_influenced in bus.influence_list:
+                    if bus_influenced not in queued:
+                        queued.add(bus_influenced)
+                        queue.append(bus_influenced)
+
+
+if __name__ == '__main__':
+    from mips16x import build_mips16x
+
+    parser = argparse.ArgumentParser(description='Compare event-driven and levelized evaluation of the mips16x')
+    parser.add_argument('image', help='program image (.bin, .hex, .mem or .s)')
+    parser.add_argument('-c', '--cycles', type=int, default=100, help='clock cycles to simulate')
+    args = parser.parse_args()
+
+    modes = {'event-driven': (False, False), 'levelized': (True, False), 'early cutoff': (True, True)}
+    for name, (levelized, early_cutoff) in modes.items():
+        cpu = build_mips16x(levelized=levelized, early_cutoff=early_cutoff)
+        cpu.load_program(args.image)
+        cpu.cycle(args.cycles)
+        component = cpu.component
+        print(
+            f'{name:>12}: '
+            f'{component.delta_cycles / args.cycles:7.1f} delta cycles/cycle '
+            f'({component.redundant_deltas / args.cycles:.1f} redundant)'
+        )
@@ -0,0 +1,439 @@
+"""Serviço de simulação do mips16x (asyncio) com um pool de instâncias aquecidas
+
+Cada processo do pool importa o flote e elabora o datapath uma única vez, na
+partida do servidor; os jobs só pagam reset, carga do programa e simulação.
+
+Protocolo: uma mensagem JSON por linha, por socket Unix ou TCP local. O cliente
+envia jobs e pode enviar vários sem esperar as respostas:
+
+    {"id": 1, "image": "<base64>" | "asm": "<fonte>", "cycles": 1000,
+     "memory": "<base64>", "memory_base": 0, "halt": true, "timeout": 5.0,
+     "dump": [início, tamanho], "trace": false, "include": [...], "exclude": [...]}
+
+Para cada job o servidor responde com os pedaços do VCD (se pedido), enviados
+durante a simulação a cada fatia de ciclos, e por fim o resultado (os jobs
+terminam fora de ordem):
+
+    {"id": 1, "type": "trace", "data": "..."}
+    {"id": 1, "type": "result", "status": "ok" | "timeout" | "error", "cycles": ...,
+     "reason": ..., "pc": ..., "registers": [...], "memory": "<base64>" | null, "elapsed": ..., "error": ...}
+
+A memória de dados só vai no resultado quando o pedido tem "dump" (o trecho
+[início, tamanho]; [0, 65536] para a memória inteira).
+
+Backpressure: com `max_pending` jobs em andamento o servidor para de ler novas
+linhas (o cliente fica bloqueado no envio). O timeout é verificado pelo worker
+a cada fatia de ciclos, então o job para e devolve o estado parcial. Pedidos
+com campos inválidos recebem um resultado com status "error".
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import queue
+import sys
+import tempfile
+import time
+from collections.abc import AsyncIterator, Iterable
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing import get_context
+
+from batch import _init_worker, worker_cpu
+
+# Tamanho máximo de uma linha do protocolo (imagens e dumps de 64 KiB em base64)
+LINE_LIMIT = 1 << 22
+# Ciclos executados entre duas verificações do timeout
+SLICE_CYCLES = 2000
+TRACE_CHUNK = 1 << 16
+# Intervalo (s) em que o servidor confere se o worker de um job com trace ainda está vivo
+TRACE_POLL = 0.2
+
+
+def _warm_up() -> int:
+    worker_cpu()
+    return os.getpid()
+
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def validate_request(request, default_timeout: float | None) -> dict:
+    """Confere os campos do pedido e preenche os padrões (ValueError com a causa se inválido)"""
+    if not isinstance(request, dict):
+        raise ValueError('request must be a JSON object')
+    if ('image' in request) == ('asm' in request):
+        raise ValueError('exactly one of "image" and "asm" is required')
+    if not isinstance(request.get('image', request.get('asm')), str):
+        raise ValueError('"image"/"asm" must be a string')
+
+    request = {
+        'cycles': 1000, 'halt': True, 'timeout': default_timeout, 'memory': None, 'memory_base': 0,
+        'dump': None, 'trace': False, 'include': None, 'exclude': None, **request,
+    }
+    if not _is_int(request['cycles']) or request['cycles'] < 0:
+        raise ValueError('"cycles" must be a non-negative integer')
+    timeout = request['timeout']
+    if timeout is not None and (not isinstance(timeout, (int, float)) or isinstance(timeout, bool) or timeout <= 0):
+        raise ValueError('"timeout" must be a positive number or null')
+    for name in ('halt', 'trace'):
+        if not isinstance(request[name], bool):
+            raise ValueError(f'"{name}" must be a boolean')
+    if request['memory'] is not None and not isinstance(request['memory'], str):
+        raise ValueError('"memory" must be a base64 string')
+    if not _is_int(request['memory_base']) or request['memory_base'] < 0:
+        raise ValueError('"memory_base" must be a non-negative integer')
+    dump = request['dump']
+    if dump is not None and not (
+            isinstance(dump, list) and len(dump) == 2 and all(_is_int(n) and n >= 0 for n in dump)):
+        raise ValueError('"dump" must be [start, size] with non-negative integers')
+    for name in ('include', 'exclude'):
+        patterns = request[name]
+        if patterns is not None and not (
+                isinstance(patterns, list) and all(isinstance(pattern, str) for pattern in patterns)):
+            raise ValueError(f'"{name}" must be a list of strings')
+
+    return request
+
+
+def run_request(request: dict, chunks: queue.Queue | None = None) -> dict:
+    """Executa um job (já validado) na instância do worker e retorna o resultado (sem o id)
+
+    Com trace, os pedaços do VCD são colocados em `chunks` à medida que são
+    gravados, seguidos de None ao final (mesmo em caso de erro).
+    """
+    cpu = worker_cpu()
+    start = time.perf_counter()
+    try:
+        if 'asm' in request:
+            from assembler import assemble
+            image = assemble(request['asm'])
+        else:
+            image = base64.b64decode(request['image'], validate=True)
+
+        cycles = request['cycles']
+        halt = request['halt']
+        timeout = request['timeout']
+        deadline = None if timeout is None else start + timeout
+
+        cpu.reset(clear_memory=True)
+        cpu.load_program(image)
+        if request['memory']:
+            cpu.memory.load(base64.b64decode(request['memory'], validate=True), request['memory_base'])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            trace_path = os.path.join(tmp, 'trace.vcd')
+            executed, reason = _simulate(cpu, cycles, halt, deadline, request, trace_path, chunks)
+    except Exception as e:  # O worker continua atendendo os próximos jobs
+        return {
+            'status': 'error', 'cycles': 0, 'elapsed': time.perf_counter() - start,
+            'error': f'{type(e).__name__}: {e}',
+        }
+    finally:
+        if chunks is not None:
+            chunks.put(None)
+
+    state = cpu.state()
+    memory = None
+    if request['dump'] is not None:
+        dump_start, dump_size = request['dump']
+        memory = base64.b64encode(state.memory[dump_start:dump_start + dump_size]).decode()
+    return {
+        'status': 'timeout' if reason == 'timeout' else 'ok',
+        'cycles': executed,
+        'reason': reason,
+        'pc': state.pc,
+        'registers': list(state.registers),
+        'memory': memory,
+        'elapsed': time.perf_counter() - start,
+        'error': None,
+    }
+
+
+def _forward(trace, chunks: queue.Queue) -> None:
+    """Envia o que foi gravado no VCD desde a última chamada, em pedaços de TRACE_CHUNK"""
+    while data := trace.read(TRACE_CHUNK):
+        chunks.put(data)
+
+
+def _simulate(
+        cpu,
+        cycles: int,
+        halt: bool,
+        deadline: float | None,
+        request: dict,
+        trace_path: str,
+        chunks: queue.Queue | None,
+) -> tuple[int, str]:
+    """Executa até `cycles` ciclos em fatias, parando no halt ou no prazo
+
+    Com trace, o VCD gravado em cada fatia é repassado a `chunks` ao fim dela.
+    """
+    writer = None
+    if request['trace']:
+        from vcd import VcdWriter
+        writer = VcdWriter(trace_path, cpu.component, request['include'], request['exclude'])
+        trace = open(trace_path)
+
+    executed = 0
+    reason = 'budget'
+    try:
+        while executed < cycles:
+            if deadline is not None and time.perf_counter() > deadline:
+                reason = 'timeout'
+                break
+
+            budget = min(SLICE_CYCLES, cycles - executed)
+            if writer is None:
+                result = cpu.run(budget, halt=halt)
+                executed += result.cycles
+                if result.reason == 'halt':
+                    reason = 'halt'
+                    break
+                continue
+
+            for _ in range(budget):
+                result = cpu.run(1, halt=halt)
+                writer.sample(executed)
+                executed += 1
+                if result.reason == 'halt':
+                    reason = 'halt'
+                    break
+            if chunks is not None:
+                writer.file.flush()
+                _forward(trace, chunks)
+            if reason == 'halt':
+                break
+    finally:
+        if writer is not None:
+            writer.close(executed)
+            if chunks is not None:
+                _forward(trace, chunks)
+            trace.close()
+
+    return executed, reason
+
+
+class SimulationServer:
+    """Servidor asyncio que distribui os jobs entre processos com instâncias aquecidas"""
+    def __init__(
+            self,
+            workers: int | None = None,
+            max_pending: int | None = None,
+            default_timeout: float | None = 30.0,
+            imem_size: int = 65536,
+            dmem_size: int = 65536,
+    ) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or 4 * self.workers
+        self.default_timeout = default_timeout
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(imem_size, dmem_size),
+        )
+        self._slots = asyncio.Semaphore(self.max_pending)
+        self._server: asyncio.AbstractServer | None = None
+        self._manager = None  # Criado no primeiro job com trace (filas compartilhadas com os workers)
+
+    async def warm_up(self) -> None:
+        """Inicia todos os processos do pool (cada um elabora a sua instância)"""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, _warm_up) for _ in range(self.workers)))
+
+    async def start(self, path: str | None = None, host: str = '127.0.0.1', port: int = 0) -> asyncio.AbstractServer:
+        """Aquece o pool e passa a aceitar conexões no socket Unix `path` ou em host:port"""
+        await self.warm_up()
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle, path, limit=LINE_LIMIT)
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port, limit=LINE_LIMIT)
+        return self._server
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.executor.shutdown(cancel_futures=True)
+        if self._manager is not None:
+            self._manager.shutdown()
+
+    def _trace_queue(self) -> queue.Queue:
+        if self._manager is None:
+            self._manager = get_context('spawn').Manager()
+        return self._manager.Queue()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        lock = asyncio.Lock()
+        tasks = set()
+
+        async def send(message: dict) -> None:
+            async with lock:
+                writer.write(json.dumps(message).encode() + b'\n')
+                await writer.drain()
+
+        try:
+            while True:
+                await self._slots.acquire()  # Backpressure: não lê mais jobs do que o pool comporta
+                try:
+                    line = await reader.readline()
+                except BaseException:
+                    self._slots.release()
+                    raise
+                if not line:
+                    self._slots.release()
+                    break
+
+                task = asyncio.create_task(self._job(line, send))  # O job devolve o slot ao terminar
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            await asyncio.gather(*tasks)
+        except ValueError as e:  # Linha acima de LINE_LIMIT: a conexão não tem como continuar
+            await asyncio.gather(*tasks, return_exceptions=True)
+            try:
+                await send({'id': None, 'type': 'result', 'status': 'error', 'error': f'Invalid request: {e}'})
+            except ConnectionError:
+                pass
+        except ConnectionError:
+            for task in tasks:
+                task.cancel()
+        finally:
+            writer.close()
+
+    async def _job(self, line: bytes, send) -> None:
+        try:
+            job_id = None
+            try:
+                request = json.loads(line)
+                if isinstance(request, dict):
+                    job_id = request.get('id')
+                request = validate_request(request, self.default_timeout)
+            except ValueError as e:
+                await send({'id': job_id, 'type': 'result', 'status': 'error', 'error': f'Invalid request: {e}'})
+                return
+
+            # O prazo é cumprido pelo próprio worker (verificado a cada SLICE_CYCLES ciclos)
+            loop = asyncio.get_running_loop()
+            chunks = self._trace_queue() if request['trace'] else None
+            future = loop.run_in_executor(self.executor, run_request, request, chunks)
+            if chunks is not None:
+                async for data in _drain(chunks, future):
+                    await send({'id': job_id, 'type': 'trace', 'data': data})
+            result = await future
+            await send({'id': job_id, 'type': 'result', **result})
+        except ConnectionError:
+            pass
+        finally:
+            self._slots.release()
+
+
+async def _drain(chunks: queue.Queue, future: asyncio.Future) -> AsyncIterator[str]:
+    """Pedaços do VCD de um job até o None final (ou até o worker morrer sem enviá-lo)"""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            data = await loop.run_in_executor(None, partial(chunks.get, timeout=TRACE_POLL))
+        except queue.Empty:
+            if future.done():
+                return
+            continue
+        if data is None:
+            return
+        yield data
+
+
+async def submit(
+        requests: Iterable[dict],
+        path: str | None = None,
+        host: str = '127.0.0.1',
+        port: int = 8765,
+) -> AsyncIterator[dict]:
+    """Envia os jobs e devolve os resultados à medida que chegam (com o VCD em `trace`, se pedido)"""
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(path, limit=LINE_LIMIT)
+    else:
+        reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+
+    async def send_all() -> None:
+        for request in requests:
+            writer.write(json.dumps(request).encode() + b'\n')
+            await writer.drain()
+        writer.write_eof()
+
+    sender = asyncio.create_task(send_all())
+    traces: dict = {}
+    try:
+        while line := await reader.readline():
+            message = json.loads(line)
+            if message['type'] == 'trace':
+                traces.setdefault(message['id'], []).append(message['data'])
+                continue
+
+            message['trace'] = ''.join(traces.pop(message['id'], [])) or None
+            yield message
+        await sender
+    finally:
+        sender.cancel()
+        writer.close()
+
+
+def _request_from_file(path: str, job_id: int, args: argparse.Namespace) -> dict:
+    request = {'id': job_id, 'cycles': args.cycles, 'trace': args.trace, 'timeout': args.timeout}
+    if path.endswith('.s'):
+        with open(path) as f:
+            request['asm'] = f.read()
+    else:
+        from batch import load_job
+        request['image'] = base64.b64encode(load_job(path, args.cycles).image).decode()
+    return request
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    server = SimulationServer(args.workers, args.max_pending, args.timeout)
+    listener = await server.start(args.socket, args.host, args.port)
+    where = args.socket or ', '.join(str(sock.getsockname()) for sock in listener.sockets)
+    print(f'mips16x server listening on {where} with {server.workers} warm instances', file=sys.stderr, flush=True)
+    try:
+        await listener.serve_forever()
+    finally:
+        await server.close()
+
+
+async def _submit(args: argparse.Namespace) -> None:
+    requests = [_request_from_file(path, i, args) for i, path in enumerate(args.images)]
+    async for result in submit(requests, args.socket, args.host, args.port):
+        trace = result.pop('trace')
+        result.pop('memory', None)
+        if trace and args.trace_dir:
+            trace_path = os.path.join(args.trace_dir, f'{os.path.basename(args.images[result["id"]])}.vcd')
+            with open(trace_path, 'w') as f:
+                f.write(trace)
+            result['trace'] = trace_path
+        result['name'] = args.images[result['id']] if result['id'] is not None else None
+        print(json.dumps(result), flush=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='mips16x simulation service with warm instances')
+    parser.add_argument('--socket', help='Unix socket path (default: TCP on --host/--port)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('-t', '--timeout', type=float, default=30.0, help='per-job timeout in seconds')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve = commands.add_parser('serve', help='start the server')
+    serve.add_argument('-j', '--workers', type=int, default=None, help='number of warm instances')
+    serve.add_argument('--max-pending', type=int, default=None, help='jobs accepted before applying backpressure')
+
+    client = commands.add_parser('submit', help='run programs on a running server')
+    client.add_argument('images', nargs='+', help='program images (.bin, .hex, .mem or .s)')
+    client.add_argument('-c', '--cycles', type=int, default=1000, help='cycle budget per program')
+    client.add_argument('--trace', action='store_true', help='request a VCD trace of each run')
+    client.add_argument('--trace-dir', default='.', help='directory for the received traces')
+
+    args = parser.parse_args()
+    asyncio.run(_serve(args) if args.command == 'serve' else _submit(args))
@@ -0,0 +1,132 @@
+from array import array
+
+from flote.backend.python.core.buses import BitBus, BitBusValue
+
+from codec import bit_value, to_int
+
+
+class StorageCell(BitBus):
+    """Barramento que expõe uma posição de um array de armazenamento
+
+    Não possui avaliador: o valor é lido e escrito diretamente no array de apoio,
+    então a posição só muda quando o bloco dono do array escreve nela.
+    """
+    def __init__(self, storage, index: int, width: int, id_: str) -> None:
+        self._storage = storage
+        self._index = index
+        self._width = width
+        super().__init__()
+        self.id = id_
+
+    @property
+    def value(self) -> BitBusValue:
+        return bit_value(self._storage[self._index], self._width)
+
+    @value.setter
+    def value(self, value: BitBusValue | None) -> None:
+        if value is not None:  # BaseBus.__init__ inicializa com None
+            self._storage[self._index] = to_int(value.raw_value)
+
+
+class RegisterFile:
+    """Banco de registradores guardado em um array('H')
+
+    Possui portas de leitura assíncronas e uma porta de escrita síncrona (ver
+    abstract.read_reg_file e abstract.update_reg_file). Cada registrador continua
+    acessível como barramento em `registers[i]` para o VCD e os testbenches.
+    """
+    def __init__(self, size: int = 16, width: int = 16, prefix: str = 'reg') -> None:
+        self.width = width
+        self.data = array('H', [0] * size)
+        self.registers = [StorageCell(self.data, i, width, f'{prefix}_{i}') for i in range(size)]
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, idx: int) -> StorageCell:
+        return self.registers[idx]
+
+    def __iter__(self):
+        return iter(self.registers)
+
+    def clear(self) -> None:
+        """Zera todos os registradores"""
+        self.data[:] = array('H', [0] * len(self.data))
+
+
+class ByteMemory:
+    """Memória endereçada a byte guardada em um bytearray (64 KiB por padrão)
+
+    Palavras de 16 bits ocupam dois bytes consecutivos (byte mais significativo
+    primeiro) e os endereços dão a volta no tamanho da memória. As células de
+    inspeção (`memory[i]`) só são criadas para os bytes acessados; com `trace`
+    ligado, os bytes escritos também são expostos no componente para o VCD.
+
+    `generation` muda a cada load, clear ou write_word, para quem guarda dados
+    derivados do conteúdo (ex.: os blocos traduzidos de isa.py); escritas diretas
+    em `data`/`view` não são contadas.
+    """
+    def __init__(self, size: int = 65536, prefix: str = 'mem', trace: bool = False) -> None:
+        self.size = size
+        self.prefix = prefix
+        self.trace = trace
+        self.data = bytearray(size)
+        self.view = memoryview(self.data)
+        self.cells: dict[int, StorageCell] = {}
+        self.generation = 0
+        self._buses: dict | None = None
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, idx: int) -> StorageCell:
+        return self.cell(idx)
+
+    def cell(self, idx: int) -> StorageCell:
+        """Retorna (criando se preciso) o barramento de inspeção do byte `idx`"""
+        cell = self.cells.get(idx)
+        if cell is None:
+            cell = StorageCell(self.data, idx, 8, f'{self.prefix}_{idx}')
+            self.cells[idx] = cell
+            if self.trace and self._buses is not None:
+                self._buses[cell.id] = cell
+
+        return cell
+
+    def attach(self, buses: dict) -> None:
+        """Liga a memória ao dicionário de barramentos do componente (usado com `trace`)"""
+        self._buses = buses
+        if self.trace:
+            for cell in self.cells.values():
+                buses[cell.id] = cell
+
+    def read_word(self, addr: int) -> int:
+        addr %= self.size
+        return (self.data[addr] << 8) | self.data[(addr + 1) % self.size]
+
+    def write_word(self, addr: int, value: int) -> None:
+        addr %= self.size
+        addr_low = (addr + 1) % self.size
+        self.data[addr] = (value >> 8) & 0xFF  # Byte mais significativo
+        self.data[addr_low] = value & 0xFF  # Byte menos significativo
+        self.generation += 1
+
+        if self.trace:
+            self.cell(addr)
+            self.cell(addr_low)
+
+    def load(self, image, base: int = 0) -> None:
+        """Copia uma imagem (bytes, bytearray, memoryview ou mmap) a partir de `base`"""
+        end = base + len(image)
+        if base < 0 or end > self.size:
+            raise ValueError(
+                f'Image of {len(image)} bytes at 0x{base:04X} does not fit in a memory of {self.size} bytes'
+            )
+
+        self.view[base:end] = image
+        self.generation += 1
+
+    def clear(self) -> None:
+        """Zera todo o conteúdo da memória"""
+        self.view[:] = bytes(self.size)
+        self.generation += 1
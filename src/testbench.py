@@ -1,6 +1,5 @@
-from flote.testbench import TestBench
-
 import mips16x
+from vcd import StreamingTestBench
 
 input_values = [
     # Teste 1: Soma (reg[0] + reg[1]) e salva no reg[4]
@@ -52,8 +51,7 @@ input_values = [
     },
 ]
 
-tb = TestBench(mips16x.mips)
-tb.set_time_unit('ns')
+tb = StreamingTestBench(mips16x.mips, 'mips16x_test.vcd', time_unit='ns')
 
 for input_set in input_values:
     input_set['clk'] = '0'
@@ -62,4 +60,4 @@ for input_set in input_values:
     tb.update({'clk': '1'})
     tb.wait(5)
 
-tb.save_vcd('mips16x_test.vcd')
+tb.close()
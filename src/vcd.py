@@ -0,0 +1,197 @@
+"""Escrita de VCD em streaming, com seleção de barramentos
+
+O TestBench do flote guarda uma amostra de todos os barramentos a cada update e
+só gera o VCD no final (save_vcd), então a memória cresce com a simulação. Aqui
+cada amostra é comparada com a anterior e apenas as mudanças de valor são
+anexadas ao arquivo, por um writer com buffer: o uso de memória é constante.
+
+A seleção usa padrões no estilo glob sobre os ids (ex.: include=['pc',
+'instruction', 'reg_*'], exclude=['imem_*']). Os barramentos são escolhidos na
+primeira amostra; os que surgirem depois (células de memória criadas durante a
+simulação) não entram no arquivo, então devem ser criados antes via memory[i].
+"""
+import os
+from collections.abc import Iterable
+from datetime import datetime
+from fnmatch import fnmatchcase
+
+from flote.backend.python.core.buses import BaseBus
+from flote.backend.python.core.component import Component
+from flote.testbench import TestBench, VALID_UNITS
+
+# Caracteres ASCII imprimíveis usados nos identificadores curtos do VCD
+_ID_CHARS = ''.join(chr(c) for c in range(33, 127))
+
+
+def vcd_identifier(index: int) -> str:
+    """Identificador curto (base 94) do `index`-ésimo sinal declarado"""
+    identifier = ''
+    while True:
+        index, digit = divmod(index, len(_ID_CHARS))
+        identifier += _ID_CHARS[digit]
+        if index == 0:
+            return identifier
+        index -= 1
+
+
+def match_ids(
+        ids: Iterable[str],
+        include: Iterable[str] | None = None,
+        exclude: Iterable[str] | None = None,
+) -> list[str]:
+    """Ids que casam com algum padrão de `include` (todos, se None) e com nenhum de `exclude`"""
+    include = list(include) if include is not None else None
+    exclude = list(exclude or ())
+
+    return [
+        bus_id for bus_id in ids
+        if (include is None or any(fnmatchcase(bus_id, pattern) for pattern in include))
+        and not any(fnmatchcase(bus_id, pattern) for pattern in exclude)
+    ]
+
+
+def select_buses(
+        buses: dict[str, BaseBus],
+        include: Iterable[str] | None = None,
+        exclude: Iterable[str] | None = None,
+) -> list[BaseBus]:
+    """Barramentos do componente selecionados por match_ids"""
+    return [buses[bus_id] for bus_id in match_ids(buses, include, exclude)]
+
+
+def vcd_header(module: str, signals: Iterable[tuple[str, str, int]], time_unit: str = 'ns') -> str:
+    """Cabeçalho do VCD para os sinais (código, id, largura), até $enddefinitions"""
+    lines = [
+        f'$date {datetime.now().strftime(r"%Y-%m-%d %H:%M:%S")} $end',
+        '$version mips16x streaming VCD writer $end',
+        f'$timescale 1{time_unit} $end',
+        f'$scope module {module} $end',
+    ]
+    for code, bus_id, width in signals:
+        lines.append(f'$var wire {width} {code} {bus_id} $end')
+    lines += ['$upscope $end', '$enddefinitions $end', '']
+    return '\n'.join(lines)
+
+
+def vcd_change(code: str, value: str) -> str:
+    """Linha de mudança de valor (escalar para 1 bit, vetor nos demais)"""
+    if len(value) == 1:
+        return f'{value}{code}\n'
+    return f'b{value} {code}\n'
+
+
+class VcdWriter:
+    """Grava as mudanças de valor dos barramentos selecionados à medida que são amostradas"""
+    def __init__(
+            self,
+            path: str | os.PathLike,
+            component: Component,
+            include: Iterable[str] | None = None,
+            exclude: Iterable[str] | None = None,
+            time_unit: str = 'ns',
+            buffer_size: int = 1 << 16,
+    ) -> None:
+        if time_unit not in VALID_UNITS:
+            raise ValueError(f'Invalid time unit "{time_unit}". Valid units are: {VALID_UNITS}')
+
+        self.component = component
+        self.include = include
+        self.exclude = exclude
+        self.time_unit = time_unit
+        self.file = open(path, 'w', buffering=buffer_size)
+        self.buses: list[BaseBus] | None = None
+        self._codes: list[str] = []
+        self._last: list[str | None] = []
+        self._time: int | None = None
+
+    def __enter__(self) -> 'VcdWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _write_header(self) -> None:
+        self.buses = select_buses(self.component.buses, self.include, self.exclude)
+        self._codes = [vcd_identifier(i) for i in range(len(self.buses))]
+        self._last = [None] * len(self.buses)
+
+        signals = [(code, bus.id, len(bus.value.raw_value)) for bus, code in zip(self.buses, self._codes)]
+        self.file.write(vcd_header(self.component.id_, signals, self.time_unit))
+
+    def sample(self, time: int) -> None:
+        """Registra os valores atuais no instante `time` (só os que mudaram desde a última amostra)"""
+        if self.buses is None:
+            self._write_header()
+
+        last = self._last
+        changes = []
+        for i, bus in enumerate(self.buses):
+            value = bus.get_vcd_repr()
+            if value != last[i]:
+                last[i] = value
+                changes.append(vcd_change(self._codes[i], value))
+
+        if changes:
+            if time != self._time:
+                changes.insert(0, f'#{time}\n')
+                self._time = time
+            self.file.write(''.join(changes))
+
+    def close(self, end_time: int | None = None) -> None:
+        """Grava o instante final (se informado) e fecha o arquivo"""
+        if self.file.closed:
+            return
+
+        if self.buses is None:
+            self._write_header()
+        if end_time is not None and end_time != self._time:
+            self.file.write(f'#{end_time}\n')
+        self.file.close()
+
+
+class StreamingTestBench(TestBench):
+    """TestBench que grava o VCD durante a simulação em vez de acumular amostras
+
+    Mesmo uso do TestBench (update/wait); o arquivo é definido na criação e
+    finalizado por close() (ou save_vcd(), mantido por compatibilidade). Outro
+    formato pode ser escolhido por `sink` (ex.: bintrace.TraceWriter), qualquer
+    classe com a mesma assinatura e os métodos sample(tempo) e close(tempo_final).
+    """
+    def __init__(
+            self,
+            component: Component,
+            path: str | os.PathLike,
+            include: Iterable[str] | None = None,
+            exclude: Iterable[str] | None = None,
+            time_unit: str = 'ns',
+            sink: type = VcdWriter,
+    ) -> None:
+        super().__init__(component)
+        self.time_unit = time_unit
+        self.path = path
+        self.writer = sink(path, component, include, exclude, time_unit)
+
+    def __enter__(self) -> 'StreamingTestBench':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def set_time_unit(self, time_unit: str) -> None:
+        if self.writer.buses is not None:
+            raise ValueError('The time unit must be set before the first update')
+        super().set_time_unit(time_unit)
+        self.writer.time_unit = time_unit
+
+    def update(self, new_values: dict[str, str]) -> None:
+        self.component.update_signals(new_values)
+        self.writer.sample(self.s_time)
+
+    def close(self) -> None:
+        self.writer.close(self.s_time)
+
+    def save_vcd(self, file_path: str | os.PathLike | None = None) -> None:
+        """Finaliza o arquivo em streaming (o caminho, se informado, deve ser o da criação)"""
+        if file_path is not None and os.fspath(file_path) != os.fspath(self.path):
+            raise ValueError(f'StreamingTestBench writes to "{self.path}", not "{file_path}"')
+        self.close()
@@ -0,0 +1,167 @@
+"""Simulação em lockstep de N instâncias do mips16x com NumPy
+
+Todas as instâncias avançam juntas um ciclo por vez: PC (N), registradores
+(N×16 uint16) e memória de dados (N×dmem_size uint8) ficam em arrays NumPy, a
+decodificação usa a CONTROL_TABLE como tabelas indexadas pelo opcode e as
+escritas são mascaradas por instância, então desvios divergentes não exigem
+tratamento especial. A semântica é a mesma de isa.IsaSimulator.
+"""
+import time
+
+import numpy as np
+
+from abstract import CONTROL_TABLE, ControlWord, NOP
+from isa import ArchState
+from loader import read_image
+
+
+class VectorizedMips16x:
+    """Lote de N instâncias do mips16x simuladas em lockstep
+
+    A memória de instruções pode ser compartilhada (um único programa para
+    todas as instâncias) ou individual (um programa por instância).
+    """
+    def __init__(
+            self,
+            n: int,
+            imem_size: int = 65536,
+            dmem_size: int = 65536,
+            initial_pc: int = 0xFFFE,
+            shared_program: bool = True,
+            table: dict[int, ControlWord] = CONTROL_TABLE,
+    ) -> None:
+        self.n = n
+        self.initial_pc = initial_pc
+        self.instruction_memory = np.zeros(imem_size if shared_program else (n, imem_size), dtype=np.uint8)
+        self.memory = np.zeros((n, dmem_size), dtype=np.uint8)
+        self.registers = np.zeros((n, 16), dtype=np.uint16)
+        self.pc = np.full(n, initial_pc, dtype=np.int64)
+        self.cycles = 0
+
+        # Tabelas de decodificação (uma entrada por opcode de 4 bits)
+        rows = [table.get(opcode, NOP) for opcode in range(16)]
+        self._reg_dst = np.array([row.reg_dst for row in rows], dtype=bool)
+        self._alu_src = np.array([row.alu_src for row in rows], dtype=bool)
+        self._mem_to_reg = np.array([row.mem_to_reg for row in rows], dtype=bool)
+        self._reg_write = np.array([row.rf_write_enable for row in rows], dtype=bool)
+        self._mem_write = np.array([row.mem_write_enable for row in rows], dtype=bool)
+        self._branch = np.array([row.branch for row in rows], dtype=bool)
+        self._alu_op = np.array([row.alu_op for row in rows], dtype=np.int64)
+        self._jump = np.array([row.jump for row in rows], dtype=bool)
+        if np.any(self._alu_op > 0b100):
+            raise ValueError('Control table uses an ALU operation not implemented by alu_out_op')
+
+        self._rows = np.arange(n)
+
+    @property
+    def shared_program(self) -> bool:
+        return self.instruction_memory.ndim == 1
+
+    def reset(self, clear_memory: bool = False) -> None:
+        """Volta todas as instâncias ao estado de reset"""
+        self.pc[:] = self.initial_pc
+        self.registers[:] = 0
+        self.cycles = 0
+        if clear_memory:
+            self.memory[:] = 0
+            self.instruction_memory[:] = 0
+
+    def load_program(self, image: bytes | str, base: int = 0, instances=None) -> None:
+        """Carrega a imagem na memória de instruções (de todas ou das instâncias indicadas)"""
+        if isinstance(image, str):
+            for address, data in read_image(image):
+                self.load_program(data, base + address, instances)
+            return
+
+        data = np.frombuffer(image, dtype=np.uint8)
+        end = base + len(data)
+        if end > self.instruction_memory.shape[-1]:
+            raise ValueError(f'Image of {len(data)} bytes at 0x{base:04X} does not fit in instruction memory')
+        if self.shared_program:
+            if instances is not None:
+                raise ValueError('Per-instance programs need shared_program=False')
+            self.instruction_memory[base:end] = data
+        else:
+            self.instruction_memory[slice(None) if instances is None else instances, base:end] = data
+
+    def _fetch(self, pc: np.ndarray) -> np.ndarray:
+        imem = self.instruction_memory
+        size = imem.shape[-1]
+        if self.shared_program:
+            high, low = imem[pc % size], imem[(pc + 1) % size]
+        else:
+            high, low = imem[self._rows, pc % size], imem[self._rows, (pc + 1) % size]
+        return (high.astype(np.int64) << 8) | low
+
+    def _execute(self, pc: np.ndarray, write: bool) -> np.ndarray:
+        """Executa a instrução em `pc` de cada instância e retorna o próximo PC
+
+        Com write=False só calcula o próximo PC (fase combinacional do reset).
+        """
+        rows = self._rows
+        regs = self.registers
+        mem = self.memory
+        mem_size = mem.shape[1]
+
+        word = self._fetch(pc)
+        opcode = word >> 12
+        rs, rt, rd = (word >> 8) & 0xF, (word >> 4) & 0xF, word & 0xF
+        immediate = np.where(rd & 0x8, rd | 0xFFF0, rd)  # sign_extend_4to16
+
+        a = regs[rows, rs].astype(np.int64)
+        b = np.where(self._alu_src[opcode], immediate, regs[rows, rt])
+
+        # ALU vetorizada (alu_out_op): todas as operações, selecionadas por alu_op
+        alu_op = self._alu_op[opcode]
+        result = np.select(
+            [alu_op == 0, alu_op == 1, alu_op == 2, alu_op == 3],
+            [(a + b) & 0xFFFF, (a - b) & 0xFFFF, a & b, a | b],
+            default=(a < b).astype(np.int64),
+        )
+
+        if write:
+            addr = result % mem_size
+            addr_low = (addr + 1) % mem_size
+
+            mem_write = self._mem_write[opcode]
+            if mem_write.any():
+                data = regs[mem_write, rt[mem_write]]
+                mem[mem_write, addr[mem_write]] = data >> 8
+                mem[mem_write, addr_low[mem_write]] = data & 0xFF
+
+            reg_write = self._reg_write[opcode]
+            if reg_write.any():
+                loaded = (mem[rows, addr].astype(np.int64) << 8) | mem[rows, addr_low]
+                value = np.where(self._mem_to_reg[opcode], loaded, result)
+                dest = np.where(self._reg_dst[opcode], rd, rt)
+                regs[reg_write, dest[reg_write]] = value[reg_write]
+
+        jump_addr = (pc & 0xF000) | ((word << 1) & 0x0FFF)
+        branch_addr = (pc + 2 + (immediate << 1)) & 0xFFFF
+        taken = self._branch[opcode] & (result == 0)
+        return np.where(self._jump[opcode], jump_addr, np.where(taken, branch_addr, (pc + 2) & 0xFFFF))
+
+    def run(self, max_cycles: int) -> int:
+        """Avança todas as instâncias `max_cycles` ciclos"""
+        next_pc = self._execute(self.pc, write=False)
+        for _ in range(max_cycles):
+            self.pc = next_pc
+            next_pc = self._execute(next_pc, write=True)
+
+        self.cycles += max_cycles
+        return max_cycles
+
+    def state(self, instance: int) -> ArchState:
+        """Estado arquitetural de uma instância no formato de isa.IsaSimulator.state()"""
+        return ArchState(
+            int(self.pc[instance]),
+            tuple(int(value) for value in self.registers[instance]),
+            self.memory[instance].tobytes(),
+        )
+
+
+def measure_throughput(sim: VectorizedMips16x, cycles: int) -> float:
+    """Executa `cycles` ciclos e retorna a vazão em instruções-instância por segundo"""
+    start = time.perf_counter()
+    sim.run(cycles)
+    return sim.n * cycles / (time.perf_counter() - start)